@@ -0,0 +1,118 @@
+import os
+from os.path import join, normpath, dirname, basename, isfile
+from os import walk
+from concurrent.futures import ThreadPoolExecutor
+from struct import pack, unpack_from, calcsize
+from pygame import Surface
+from settings import *
+from binary import write_string, read_string
+
+# build with `python atlas.py` from the src folder
+ATLAS_SOURCES = [
+    ('..', 'graphics', 'characters'),
+    ('..', 'graphics', 'icons'),
+    ('..', 'graphics', 'monsters'),
+    ('..', 'graphics', 'tilesets', 'water'),
+    ('..', 'graphics', 'tilesets', 'coast.png'),
+    ('..', 'graphics', 'other', 'shadow.png'),
+    ('..', 'graphics', 'ui'),
+]
+ATLAS_PATH = ('..', 'graphics', 'atlas')
+ATLAS_MANIFEST = 'atlas.bin'
+ATLAS_PAGE_SIZE = 2048
+
+# manifest layout: header, page file names, then one rect per image key
+MANIFEST_MAGIC = b'MHAT'
+MANIFEST_VERSION = 1
+HEADER = '<4sHHI'
+ENTRY = '<HHHHH'
+
+def atlas_key(full_path) -> str:
+    """Key of an image file, its normalised path relative to the src folder"""
+    return normpath(full_path).replace(os.sep, '/')
+
+def pack_shelves(sizes, page_size) -> list[tuple[int, int, int]]:
+    """Places (w, h) sizes on shelves, returns (page, x, y) for each size in the given order"""
+    order = sorted(range(len(sizes)), key = lambda index: sizes[index][1], reverse = True)
+    places = [None] * len(sizes)
+    page, x, y, shelf_height = 0, 0, 0, 0
+    for index in order:
+        width, height = sizes[index]
+        if width > page_size or height > page_size:
+            raise ValueError(f'image of size {width}x{height} does not fit an atlas page of {page_size}')
+        if x + width > page_size:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        if y + height > page_size:
+            page, x, y, shelf_height = page + 1, 0, 0, 0
+        places[index] = (page, x, y)
+        x += width
+        shelf_height = max(shelf_height, height)
+    return places
+
+def build_atlas(sources = ATLAS_SOURCES, target = ATLAS_PATH, page_size = ATLAS_PAGE_SIZE) -> None:
+    """Packs the source images into atlas pages and writes the binary manifest next to them"""
+    files = []
+    for source in sources:
+        if isfile(join(*source)):
+            files.append(join(*source))
+        for folder_path, sub_folders, image_names in walk(join(*source)):
+            files.extend(join(folder_path, name) for name in sorted(image_names) if name.endswith('.png'))
+    images = [pygame.image.load(path) for path in files]
+    places = pack_shelves([image.get_size() for image in images], page_size)
+
+    page_count = max(page for page, _, _ in places) + 1 if places else 0
+    pages = [Surface((page_size, page_size), pygame.SRCALPHA) for _ in range(page_count)]
+    for image, (page, x, y) in zip(images, places):
+        pages[page].blit(image, (x, y))
+
+    os.makedirs(join(*target), exist_ok = True)
+    page_names = [f'atlas_{index}.png' for index in range(page_count)]
+    manifest = pack(HEADER, MANIFEST_MAGIC, MANIFEST_VERSION, page_count, len(files))
+    for page_surf, page_name in zip(pages, page_names):
+        pygame.image.save(page_surf, join(*target, page_name))
+        manifest += write_string(page_name)
+    for path, image, (page, x, y) in zip(files, images, places):
+        manifest += write_string(atlas_key(path)) + pack(ENTRY, page, x, y, *image.get_size())
+    with open(join(*target, ATLAS_MANIFEST), 'wb') as file:
+        file.write(manifest)
+
+class Atlas:
+    """Packed atlas pages, hands out images as subsurfaces of the pages"""
+    def __init__(self, *path) -> None:
+        with open(join(*path, ATLAS_MANIFEST), 'rb') as file:
+            data = file.read()
+        magic, version, page_count, entry_count = unpack_from(HEADER, data)
+        if magic != MANIFEST_MAGIC or version != MANIFEST_VERSION:
+            raise ValueError(f'unsupported atlas manifest in {join(*path)}')
+        offset = calcsize(HEADER)
+        page_names = []
+        for _ in range(page_count):
+            page_name, offset = read_string(data, offset)
+            page_names.append(page_name)
+        self.rects: dict[str, tuple[int, pygame.Rect]] = {}
+        self.folders: dict[str, list[str]] = {}
+        for _ in range(entry_count):
+            key, offset = read_string(data, offset)
+            page, x, y, width, height = unpack_from(ENTRY, data, offset)
+            offset += calcsize(ENTRY)
+            self.rects[key] = (page, pygame.Rect(x, y, width, height))
+            self.folders.setdefault(dirname(key), []).append(basename(key))
+        # pages decode in parallel, conversion needs the display and stays on this thread
+        with ThreadPoolExecutor() as executor:
+            pages = executor.map(pygame.image.load, [join(*path, page_name) for page_name in page_names])
+            self.pages = [page.convert_alpha() for page in pages]
+
+    def __contains__(self, full_path) -> bool:
+        return atlas_key(full_path) in self.rects
+
+    def image(self, full_path) -> Surface:
+        page, rect = self.rects[atlas_key(full_path)]
+        return self.pages[page].subsurface(rect)
+
+    def image_names(self, folder_path) -> list[str] | None:
+        """File names packed from a folder, None if the folder isn't part of the atlas"""
+        return self.folders.get(atlas_key(folder_path))
+
+if __name__ == '__main__':
+    os.chdir(dirname(__file__))
+    build_atlas()
@@ -0,0 +1,105 @@
+from os.path import join
+from concurrent.futures import Future, ThreadPoolExecutor
+from settings import *
+from timer import Timer
+
+# long tracks are streamed from disk by mixer.music, everything else is a decoded Sound
+MUSIC_TRACKS = {'overworld': 'overworld.ogg', 'battle': 'battle.ogg', 'evolution': 'evolution.mp3'}
+SOUND_FILES = {
+    'notice': 'notice.wav',
+    # attack sounds, for the battle screen, the overworld has nothing that plays them
+    'fire': 'fire.wav',
+    'explosion': 'explosion.wav',
+    'green': 'green.wav',
+    'splash': 'splash.wav',
+    'ice': 'ice.mp3',
+    'scratch': 'scratch.mp3'}
+# higher priority sounds may take a channel from lower priority ones when the pool is full
+SOUND_PRIORITY = {'notice': 2}
+
+class Audio:
+    """Streams music and plays lazily decoded sound effects over a fixed pool of channels"""
+    def __init__(self, *path) -> None:
+        self.path = path
+        self.music = None
+        self.fade_ms = MUSIC_FADE
+        # the next track starts once the current one has faded out
+        self.fade_timer = Timer(MUSIC_FADE, func = self.start_music)
+        self.sounds: dict[str, pygame.mixer.Sound] = {}
+        self.futures: dict[str, Future] = {}
+        self.executor = ThreadPoolExecutor(max_workers = 1)
+        # the game runs silent on machines without an audio device
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            pygame.mixer.set_num_channels(AUDIO_CHANNELS)
+            pygame.mixer.music.set_volume(MUSIC_VOLUME)
+            self.channels = [pygame.mixer.Channel(index) for index in range(AUDIO_CHANNELS)]
+        except pygame.error:
+            self.channels = []
+        # priority and start order of what each channel plays
+        self.playing: list[tuple[int, int]] = [(0, 0)] * len(self.channels)
+        self.started = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.channels)
+
+    def play_music(self, name, fade_ms = MUSIC_FADE) -> None:
+        if not self.enabled or self.music == name:
+            return
+        self.music, self.fade_ms = name, fade_ms
+        # loading right away would cut the old track off, a fade already running picks up the new name when it ends
+        if pygame.mixer.music.get_busy() or self.fade_timer.active:
+            if not self.fade_timer.active:
+                pygame.mixer.music.fadeout(fade_ms)
+                self.fade_timer.duration = fade_ms
+                self.fade_timer.activate()
+        else:
+            self.start_music()
+
+    def start_music(self) -> None:
+        pygame.mixer.music.load(join(*self.path, MUSIC_TRACKS[self.music]))
+        pygame.mixer.music.play(-1, fade_ms = self.fade_ms)
+
+    def load(self, name) -> pygame.mixer.Sound:
+        sound = pygame.mixer.Sound(join(*self.path, SOUND_FILES[name]))
+        sound.set_volume(SOUND_VOLUME)
+        return sound
+
+    def prefetch(self, *names) -> None:
+        """Decodes sounds on the worker thread so their first play doesn't wait for the disk"""
+        if not self.enabled:
+            return
+        for name in names:
+            if name not in self.sounds and name not in self.futures:
+                self.futures[name] = self.executor.submit(self.load, name)
+
+    def sound(self, name) -> pygame.mixer.Sound:
+        if name not in self.sounds:
+            future = self.futures.pop(name, None)
+            self.sounds[name] = future.result() if future else self.load(name)
+        return self.sounds[name]
+
+    def channel(self, priority) -> int | None:
+        """Index of a free channel, else of the oldest one playing lower or equal priority"""
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index
+        candidates = [index for index, (playing, _) in enumerate(self.playing) if playing <= priority]
+        if candidates:
+            return min(candidates, key = lambda index: self.playing[index])
+
+    def play(self, name) -> None:
+        if not self.enabled:
+            return
+        priority = SOUND_PRIORITY.get(name, 1)
+        index = self.channel(priority)
+        if index is None:
+            return
+        self.started += 1
+        self.playing[index] = (priority, self.started)
+        self.channels[index].play(self.sound(name))
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures = True)
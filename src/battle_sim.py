@@ -0,0 +1,157 @@
+import numpy as np
+from argparse import ArgumentParser
+from time import perf_counter
+from game_data import CHARACTER_DATA, PLAYER_MONSTERS
+from game_tables import MONSTER_IDS, ATTACK_NAMES, BASE_STATS, STATS, MONSTER_ELEMENT, UNLOCK_LEVEL, \
+    ATTACK_AMOUNT, ATTACK_COST, ATTACK_ON_SELF, ATTACK_ELEMENT, ELEMENT_MULTIPLIER
+
+# headless battle resolution, run `python battle_sim.py` from the src folder for a balance sweep
+MAX_ROUNDS = 200
+SWEEP_REPEATS = 10000
+SWEEP_SEED = 1
+BATCH_SIZE = 16384
+# winner codes
+LEFT, RIGHT, DRAW, RUNNING = 0, 1, 2, -1
+
+def encode_teams(teams, size) -> tuple[np.ndarray, np.ndarray]:
+    """Name ids and levels of teams given as {slot: (name, level)}, padded with name id -1"""
+    name_ids = np.full((len(teams), size), -1, dtype = np.int16)
+    levels = np.zeros((len(teams), size), dtype = np.int16)
+    for row, team in enumerate(teams):
+        for column, (name, level) in enumerate(team[slot] for slot in sorted(team)):
+            name_ids[row, column], levels[row, column] = MONSTER_IDS[name], level
+    return name_ids, levels
+
+class BattleBatch:
+    """Resolves many team battles at once, one active monster per side, all state in (battle, side, slot) arrays
+
+    Each round the faster active monster acts first, ties are a coin flip. A monster picks a random ability
+    it has learned and can pay for and applies it to the opposing active monster, or itself for 'player' attacks.
+    Damage is amount * attack * element multiplier, reduced by the target's defense / 2000. A monster that
+    can't afford any ability recovers its recovery stat in energy instead. Fainted monsters are replaced by the
+    next one in the team, the side that runs out loses.
+    """
+    def __init__(self, left, right, seed = None) -> None:
+        (left_ids, left_levels), (right_ids, right_levels) = left, right
+        size = max(left_ids.shape[1], right_ids.shape[1])
+        pad = lambda array, fill: np.pad(array, ((0, 0), (0, size - array.shape[1])), constant_values = fill)
+        self.name_id = np.stack([pad(left_ids, -1), pad(right_ids, -1)], axis = 1)
+        self.level = np.stack([pad(left_levels, 0), pad(right_levels, 0)], axis = 1)
+        self.rng = np.random.default_rng(seed)
+        self.count, self.size = len(self.name_id), size
+
+        exists = self.name_id >= 0
+        name_id = np.where(exists, self.name_id, 0)
+        stats = BASE_STATS[name_id] * self.level[..., None]
+        self.max_health = stats[..., STATS['max_health']]
+        self.max_energy = stats[..., STATS['max_energy']]
+        self.attack = stats[..., STATS['attack']]
+        self.defense = stats[..., STATS['defense']]
+        self.recovery = stats[..., STATS['recovery']]
+        self.speed = stats[..., STATS['speed']]
+        self.element = MONSTER_ELEMENT[name_id]
+        self.abilities = (UNLOCK_LEVEL[name_id] <= self.level[..., None]) & exists[..., None]
+        self.health = np.where(exists, self.max_health, 0)
+        self.energy = self.max_energy.copy()
+
+        self.active = np.zeros((self.count, 2), dtype = np.intp)
+        self.winner = np.full(self.count, RUNNING, dtype = np.int8)
+        self.rounds = np.zeros(self.count, dtype = np.int32)
+        self.replace_fainted(np.arange(self.count))
+
+    def run(self, max_rounds = MAX_ROUNDS) -> np.ndarray:
+        """Plays rounds until every battle is decided, battles still going after max_rounds are draws"""
+        for _ in range(max_rounds):
+            battles = np.flatnonzero(self.winner == RUNNING)
+            if not len(battles):
+                break
+            self.rounds[battles] += 1
+            self.round(battles)
+        self.winner[self.winner == RUNNING] = DRAW
+        return self.winner
+
+    def round(self, battles) -> None:
+        # monsters brought in mid round wait for the next one
+        slots = self.active[battles]
+        left_speed = self.speed[battles, LEFT, slots[:, LEFT]]
+        right_speed = self.speed[battles, RIGHT, slots[:, RIGHT]]
+        coin = self.rng.integers(0, 2, len(battles))
+        first = np.where(left_speed == right_speed, coin, (right_speed > left_speed).astype(np.intp))
+        rows = np.arange(len(battles))
+        self.act(battles, first, slots[rows, first])
+        # the slower side only acts if its monster survived and the battle is still on
+        self.act(battles, 1 - first, slots[rows, 1 - first])
+
+    def monster(self, battles, side, slot) -> np.ndarray:
+        """Flat index into the raveled (battle, side, slot) arrays, one fancy index instead of three"""
+        return (battles * 2 + side) * self.size + slot
+
+    def act(self, battles, side, slot) -> None:
+        health, energy = self.health.reshape(-1), self.energy.reshape(-1)
+        monster = self.monster(battles, side, slot)
+        acting = (self.winner[battles] == RUNNING) & (health[monster] > 0)
+        battles, side, monster = battles[acting], side[acting], monster[acting]
+        current = energy[monster]
+
+        # random affordable ability, by taking the largest random key among the allowed ones
+        affordable = self.abilities.reshape(-1, len(ATTACK_NAMES))[monster] & (ATTACK_COST <= current[:, None])
+        keys = np.where(affordable, self.rng.random(affordable.shape), -1)
+        attack = keys.argmax(axis = 1)
+        attacks = affordable.any(axis = 1)
+        energy[monster] = np.minimum(np.where(attacks, current - ATTACK_COST[attack], current + self.recovery.reshape(-1)[monster]), \
+                                     self.max_energy.reshape(-1)[monster])
+
+        battles, side, monster, attack = battles[attacks], side[attacks], monster[attacks], attack[attacks]
+        target_side = np.where(ATTACK_ON_SELF[attack], side, 1 - side)
+        target = self.monster(battles, target_side, self.active[battles, target_side])
+        multiplier = ELEMENT_MULTIPLIER[ATTACK_ELEMENT[attack], self.element.reshape(-1)[target]]
+        defense = np.clip(1 - self.defense.reshape(-1)[target] / 2000, 0, 1)
+        damage = ATTACK_AMOUNT[attack] * self.attack.reshape(-1)[monster] * multiplier * defense
+        health[target] = np.minimum(health[target] - damage, self.max_health.reshape(-1)[target])
+        self.replace_fainted(battles)
+
+    def replace_fainted(self, battles) -> None:
+        """Brings in the next monster for sides whose active one fainted and settles battles where a side ran out"""
+        out = np.zeros((len(battles), 2), dtype = bool)
+        for side in (LEFT, RIGHT):
+            alive = self.health[battles, side] > 0
+            out[:, side] = ~alive.any(axis = 1)
+            # first monster still standing, fainted ones never come back
+            self.active[battles, side] = np.where(out[:, side], self.active[battles, side], alive.argmax(axis = 1))
+        decided = np.select([out.all(axis = 1), out[:, LEFT], out[:, RIGHT]], [DRAW, RIGHT, LEFT], RUNNING)
+        self.winner[battles] = np.where(self.winner[battles] == RUNNING, decided, self.winner[battles])
+
+def sweep(party, trainers, repeats = SWEEP_REPEATS, seed = SWEEP_SEED) -> dict[str, dict[str, float]]:
+    """Battles the party against every trainer team repeats times, returns win/loss/draw rates per trainer"""
+    names = list(trainers)
+    teams = [trainers[name] for name in names]
+    size = max(len(team) for team in [party, *teams])
+    party_ids, party_levels = encode_teams([party], size)
+    trainer_ids, trainer_levels = encode_teams(teams, size)
+    # every trainer repeats times in a row against a copy of the party, in batches small enough to stay in cache
+    rows = np.repeat(np.arange(len(names)), repeats)
+    winners = np.empty(len(rows), dtype = np.int8)
+    for start in range(0, len(rows), BATCH_SIZE):
+        chunk = rows[start: start + BATCH_SIZE]
+        batch = BattleBatch(
+            (np.repeat(party_ids, len(chunk), axis = 0), np.repeat(party_levels, len(chunk), axis = 0)),
+            (trainer_ids[chunk], trainer_levels[chunk]),
+            (seed, start))
+        winners[start: start + len(chunk)] = batch.run()
+    winners = winners.reshape(len(names), repeats)
+    return {name: {'win': float((row == LEFT).mean()), 'loss': float((row == RIGHT).mean()), 'draw': float((row == DRAW).mean())} \
+            for name, row in zip(names, winners)}
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description = 'Battles the player party against every trainer team and prints the outcome rates')
+    parser.add_argument('--repeats', type = int, default = SWEEP_REPEATS, help = 'battles per trainer')
+    parser.add_argument('--seed', type = int, default = SWEEP_SEED)
+    args = parser.parse_args()
+
+    trainers = {name: data['monsters'] for name, data in CHARACTER_DATA.items() if 'monsters' in data}
+    start = perf_counter()
+    results = sweep(PLAYER_MONSTERS, trainers, args.repeats, args.seed)
+    duration = perf_counter() - start
+    for name, rates in results.items():
+        print(f'{name:>4}: win {rates["win"]:6.1%}  loss {rates["loss"]:6.1%}  draw {rates["draw"]:6.1%}')
+    print(f'{len(trainers) * args.repeats} battles in {duration:.2f}s')
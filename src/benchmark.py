@@ -0,0 +1,217 @@
+import os
+# headless, has to be set before pygame opens a display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import json
+import random
+from collections import deque
+from argparse import ArgumentParser
+from time import perf_counter
+from settings import *
+import timer
+from main import Game
+from scene import SceneCache
+
+BENCHMARK_DT = 1 / 60
+BENCHMARK_SEED = 1
+GOAL_FRAMES = 1200
+DIALOG_PRESS_INTERVAL = 35
+NAV_CELL_SIZE = TILE_SIZE // 2
+TALK_DISTANCE = 95
+TRANSITION_WAIT = 10
+
+class KeyState:
+    """Indexable like the result of pygame.key.get_pressed"""
+    def __init__(self, keys) -> None:
+        self.keys = keys
+
+    def __getitem__(self, key) -> bool:
+        return key in self.keys
+
+class ScriptedInput:
+    """Stands in for pygame.key, replaying held and just pressed keys"""
+    def __init__(self) -> None:
+        self.held = set()
+        self.just_pressed = set()
+
+    def get_pressed(self) -> KeyState:
+        return KeyState(self.held)
+
+    def get_just_pressed(self) -> KeyState:
+        return KeyState(self.just_pressed)
+
+class SimulatedClock:
+    """Millisecond clock that only moves with the fixed benchmark dt"""
+    def __init__(self) -> None:
+        self.ticks = 0.0
+
+    def advance(self, dt) -> None:
+        self.ticks += dt * 1000
+
+    def get_ticks(self) -> int:
+        return int(self.ticks)
+
+def percentiles(times) -> dict[str, float]:
+    if not times:
+        return {}
+    ordered = sorted(times)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99), 'max': ordered[-1] * 1000}
+
+class Benchmark:
+    """Replays a scripted walk on every map and records frame times"""
+    def __init__(self, seed = BENCHMARK_SEED, dt = BENCHMARK_DT) -> None:
+        random.seed(seed)
+        self.seed, self.dt = seed, dt
+        self.input = ScriptedInput()
+        self.clock = SimulatedClock()
+        pygame.key.get_pressed = self.input.get_pressed
+        pygame.key.get_just_pressed = self.input.get_just_pressed
+        timer.get_ticks = self.clock.get_ticks
+        # never load or autosave a player's game
+        self.game = Game(save_path = None)
+
+    def frame(self) -> None:
+        game = self.game
+        had_dialog = game.dialog_tree is not None
+        self.clock.advance(self.dt)
+        start = perf_counter()
+        game.update(self.dt)
+        updated = perf_counter()
+        game.draw(self.dt)
+        drawn = perf_counter()
+        self.input.just_pressed.clear()
+        self.update_times.append(updated - start)
+        self.draw_times.append(drawn - updated)
+        if game.dialog_tree and not had_dialog:
+            self.dialogs += 1
+
+    def finish_dialog(self) -> None:
+        for index in range(GOAL_FRAMES):
+            if not self.game.dialog_tree:
+                return
+            if index % DIALOG_PRESS_INTERVAL == 0:
+                self.input.just_pressed.add(pygame.K_SPACE)
+            self.frame()
+
+    def blocked(self, rect) -> bool:
+        return any(sprite.hitbox.colliderect(rect) for sprite in self.game.collision_sprites.nearby(rect))
+
+    def find_path(self, goal) -> list[vector] | None:
+        """Breadth first search over NAV_CELL_SIZE cells the player hitbox fits in, returns waypoints to a cell where goal(hitbox) holds"""
+        game = self.game
+        tmx_map = game.tmx_maps[game.scene.name]
+        cols, rows = tmx_map.width * TILE_SIZE // NAV_CELL_SIZE, tmx_map.height * TILE_SIZE // NAV_CELL_SIZE
+        hitbox = game.player.hitbox.copy()
+        def hitbox_at(cell):
+            return hitbox.move_to(center = ((cell[0] + 0.5) * NAV_CELL_SIZE, (cell[1] + 0.5) * NAV_CELL_SIZE))
+        start = (int(hitbox.centerx // NAV_CELL_SIZE), int(hitbox.centery // NAV_CELL_SIZE))
+        parents, queue = {start: None}, deque([start])
+        while queue:
+            cell = queue.popleft()
+            if goal(hitbox_at(cell)):
+                path = []
+                while cell:
+                    path.append(vector(hitbox_at(cell).center))
+                    cell = parents[cell]
+                return path[::-1]
+            for step in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                neighbour = (cell[0] + step[0], cell[1] + step[1])
+                if neighbour not in parents and 0 <= neighbour[0] < cols and 0 <= neighbour[1] < rows:
+                    parents[neighbour] = cell
+                    if not self.blocked(hitbox_at(neighbour)):
+                        queue.append(neighbour)
+
+    def steer(self, target, deadzone) -> None:
+        relation = vector(target) - vector(self.game.player.rect.center)
+        self.input.held = {key for key, pressed in (
+            (pygame.K_RIGHT, relation.x > deadzone), (pygame.K_LEFT, relation.x < -deadzone),
+            (pygame.K_DOWN, relation.y > deadzone), (pygame.K_UP, relation.y < -deadzone)) if pressed}
+
+    def walk_to(self, goal, fallback_target) -> bool:
+        """Follows the path to the goal, steering straight at fallback_target if there is none"""
+        game = self.game
+        path = self.find_path(goal) or [vector(fallback_target)]
+        for _ in range(GOAL_FRAMES):
+            if game.dialog_tree:
+                self.input.held.clear()
+                self.finish_dialog()
+            if game.tint_mode == 'tint' or goal(game.player.hitbox):
+                break
+            while len(path) > 1 and path[0].distance_to(game.player.rect.center) < NAV_CELL_SIZE / 4:
+                path.pop(0)
+            self.steer(path[0], 2)
+            self.frame()
+        self.input.held.clear()
+        return goal(game.player.hitbox)
+
+    def run_map(self, name) -> dict:
+        game = self.game
+        spawn = next(obj.properties['pos'] for obj in game.tmx_maps[name].get_layer_by_name('Entities') if obj.name == 'Player')
+        # start from an empty cache so setup is measured cold
+        game.scene_cache = SceneCache()
+        start = perf_counter()
+        game.load_map(name, spawn)
+        setup_time = perf_counter() - start
+        self.update_times, self.draw_times, self.dialogs = [], [], 0
+        game.dialog_tree, game.index_open = None, False
+        game.tint_mode, game.tint_progress, game.transition_target = 'untint', 0, None
+
+        # talk to every character, closest first, trainers notice the player on the way
+        characters = sorted(game.character_sprites, key = lambda character: vector(character.rect.center).distance_to(game.player.rect.center))
+        for character in characters:
+            # close enough and lined up for Game.input to start the dialog
+            near = lambda hitbox: min(abs(hitbox.centerx - character.rect.centerx), abs(hitbox.centery - character.rect.centery)) < 20 \
+                and vector(hitbox.center).distance_to(character.rect.center) < TALK_DISTANCE
+            if self.walk_to(near, character.rect.center):
+                game.player.change_facing_direction(character.rect.center)
+                self.input.just_pressed.add(pygame.K_SPACE)
+                self.frame()
+                self.finish_dialog()
+        notices = sum(character.has_noticed for character in characters)
+
+        # leave through the closest transition
+        transitions = 0
+        exits = sorted(game.transition_sprites, key = lambda sprite: vector(sprite.rect.center).distance_to(game.player.rect.center))
+        if exits:
+            self.walk_to(exits[0].rect.colliderect, exits[0].rect.center)
+            for index in range(GOAL_FRAMES):
+                self.frame()
+                if game.tint_mode == 'untint' and game.tint_progress == 0 and (game.scene.name != name or index > TRANSITION_WAIT):
+                    break
+            transitions = int(game.scene.name != name)
+
+        return {
+            'setup_ms': setup_time * 1000,
+            'frames': len(self.update_times),
+            'update_ms': percentiles(self.update_times),
+            'draw_ms': percentiles(self.draw_times),
+            'notices': notices,
+            'dialogs': self.dialogs,
+            'transitions': transitions}
+
+    def run(self, names) -> dict:
+        results = {}
+        for name in names:
+            try:
+                results[name] = self.run_map(name)
+            except ValueError as error:
+                # maps without the overworld layers can't be set up
+                results[name] = {'error': str(error)}
+        return {'seed': self.seed, 'dt': self.dt, 'maps': results}
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description = 'Headless frame time benchmark over the maps in data/maps')
+    parser.add_argument('maps', nargs = '*', help = 'map names, all maps by default')
+    parser.add_argument('--seed', type = int, default = BENCHMARK_SEED)
+    parser.add_argument('--output', help = 'write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    benchmark = Benchmark(args.seed)
+    report = json.dumps(benchmark.run(args.maps or list(benchmark.game.tmx_maps)), indent = 2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report)
+    else:
+        print(report)
@@ -0,0 +1,11 @@
+from struct import pack, unpack_from, calcsize
+
+# length prefixed utf-8 strings, shared by the atlas manifest and save files
+def write_string(text) -> bytes:
+    data = text.encode('utf-8')
+    return pack('<H', len(data)) + data
+
+def read_string(data, offset) -> tuple[str, int]:
+    length, = unpack_from('<H', data, offset)
+    offset += calcsize('<H')
+    return data[offset: offset + length].decode('utf-8'), offset + length
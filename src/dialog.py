@@ -1,6 +1,7 @@
 from pygame import Surface
 from timer import Timer
 from settings import *
+from text_cache import text_cache
 
 class DialogTree():
     """Class that creates and manages the dialog between the player and NPCs"""
@@ -37,7 +38,6 @@ class DialogTree():
                 self.end_dialog(self.character)
     
     def update(self) -> None:
-        self.dialog_timer.update()
         self.input()
 
 class DialogSprite(pygame.sprite.Sprite):
@@ -47,7 +47,7 @@ class DialogSprite(pygame.sprite.Sprite):
         self.z = WORLD_LAYERS['top']
 
         # text
-        text_surf: Surface = font.render(message, False, COLORS['black'])
+        text_surf: Surface = text_cache.render(font, message, COLORS['black'])
         padding = 5
         width = max(30,text_surf.get_width() + padding * 2)
         height = text_surf.get_height() + padding * 2
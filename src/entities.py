@@ -56,12 +56,13 @@ class Entity(pygame.sprite.Sprite):
 class Character(Entity):
     """Non-player Character Sprite"""
     def __init__(self, pos, facing_direction, frames, groups, \
-                character_data, player, create_dialog, collision_sprites, radius) -> None:
+                character_id, character_data, player, create_dialog, collision_sprites, radius) -> None:
         super().__init__(pos, facing_direction, frames, groups)
+        self.character_id = character_id
         self.character_data = character_data
         self.player = player
         self.create_dialog = create_dialog
-        self.collision_rects = [sprite.rect for sprite in collision_sprites if sprite is not self]
+        self.collision_sprites = collision_sprites
         # movemement
         self.has_moved = False
         self.can_rotate = True
@@ -88,8 +89,7 @@ class Character(Entity):
 
     def has_los(self) -> bool:
         if vector(self.rect.center).distance_to(self.player.rect.center) < self.radius:
-            collisions = [bool(rect.clipline(self.rect.center, self.player.rect.center)) for rect in self.collision_rects]
-            return not any(collisions)
+            return not self.collision_sprites.line_blocked(self.rect.center, self.player.rect.center, exclude = self)
 
     def start_move(self) -> None:
         relation = (vector(self.player.rect.center) - vector(self.rect.center)).normalize()
@@ -100,6 +100,7 @@ class Character(Entity):
             if not self.hitbox.inflate(10,10).colliderect(self.player.hitbox):
                 self.rect.center += self.direction * self.speed * dt
                 self.hitbox.center = self.rect.center
+                self.y_sort = self.rect.centery
             else:
                 self.direction = vector(0,0)
                 self.has_moved = True
@@ -111,8 +112,6 @@ class Character(Entity):
             self.facing_direction = choice(self.view_directions)
 
     def update(self, dt) -> None:
-        for timer in self.timers.values():
-            timer.update()
         self.get_state()
         self.animate(dt)
         if self.character_data['look_around']:
@@ -123,10 +122,19 @@ class Player(Entity):
     """ Player Sprite."""
     def __init__(self, pos, facing_direction, frames, groups, collision_sprites) -> None:
         super().__init__(pos, facing_direction, frames, groups)
-        self.collision_sprites: pygame.sprite.Group = collision_sprites
+        self.collision_sprites = collision_sprites
         self.hitbox: FRect = self.rect.inflate(-self.rect.width*0.6, -75)
         self.noticed = False
 
+    def respawn(self, pos, facing_direction) -> None:
+        """Places the player back on a cached map"""
+        self.rect.center = pos
+        self.hitbox.center = self.rect.center
+        self.y_sort = self.rect.centery
+        self.facing_direction = facing_direction
+        self.noticed = False
+        self.unblock()
+
     def input(self) -> None:
         keys = pygame.key.get_pressed()
         input_vector = vector()
@@ -149,7 +157,7 @@ class Player(Entity):
         self.collisions('vertical')
 
     def collisions(self, axis) -> None:
-        for sprite in self.collision_sprites:
+        for sprite in self.collision_sprites.nearby(self.hitbox):
             if sprite.hitbox.colliderect(self.hitbox):
                 if axis == 'horizontal':
                     if self.direction.x > 0:
@@ -340,4 +340,14 @@ ATTACK_DATA = {
 	'explosion':  {'target': 'opponent', 'amount': 2,    'cost': 90, 'element': 'fire',   'animation': 'explosion'},
 	'annihilate': {'target': 'opponent', 'amount': 2,    'cost': 15, 'element': 'fire',   'animation': 'explosion'},
 	'ice':        {'target': 'opponent', 'amount': 2,    'cost': 15, 'element': 'water',  'animation': 'ice'},
-}
\ No newline at end of file
+}
+
+PLAYER_MONSTERS = {
+	0: ('Ivieron', 32),
+	1: ('Atrox', 15),
+	2: ('Cindrill', 16),
+	3: ('Atrox', 10),
+	4: ('Sparchu', 11),
+	5: ('Gulfin', 9),
+	6: ('Jacana', 10),
+}
@@ -0,0 +1,117 @@
+import numpy as np
+from bisect import bisect_right
+from numbers import Real
+from game_data import CHARACTER_DATA, MONSTER_DATA, ATTACK_DATA, PLAYER_MONSTERS
+
+# game_data compiled into id indexed tables at import, bad data raises ValueError here instead of mid game
+ELEMENTS = ['normal', 'fire', 'water', 'plant']
+# attacking element -> element it is strong against, the reverse pairing is weak
+ELEMENT_STRENGTHS = {'fire': 'plant', 'water': 'fire', 'plant': 'water'}
+STAT_NAMES = ['max_health', 'max_energy', 'attack', 'defense', 'recovery', 'speed']
+ATTACK_TARGETS = ['player', 'opponent']
+DIRECTIONS = ['up', 'down', 'left', 'right']
+
+def check(condition, message) -> None:
+    if not condition:
+        raise ValueError(f'game data: {message}')
+
+def check_keys(owner, data, keys) -> None:
+    check(isinstance(data, dict), f'{owner} is not a dict')
+    missing = [key for key in keys if key not in data]
+    check(not missing, f'{owner} is missing {", ".join(missing)}')
+
+def check_team(owner, team) -> None:
+    for slot, member in team.items():
+        check(isinstance(member, tuple) and len(member) == 2, f'{owner} monster {slot} is not a (name, level) pair')
+        name, level = member
+        check(name in MONSTER_DATA, f'{owner} has unknown monster {name!r}')
+        check(isinstance(level, int) and level >= 1, f'{owner} has {name} at invalid level {level!r}')
+
+def validate() -> None:
+    for name, data in ATTACK_DATA.items():
+        check_keys(f'attack {name}', data, ['target', 'element', 'amount', 'cost'])
+        check(data['target'] in ATTACK_TARGETS, f'attack {name} has unknown target {data["target"]!r}')
+        check(data['element'] in ELEMENTS, f'attack {name} has unknown element {data["element"]!r}')
+        check(isinstance(data['amount'], Real), f'attack {name} amount is not a number')
+        check(isinstance(data['cost'], Real) and data['cost'] >= 0, f'attack {name} has invalid cost {data["cost"]!r}')
+    for name, data in MONSTER_DATA.items():
+        check_keys(f'monster {name}', data, ['stats', 'abilities', 'evolve'])
+        stats = data['stats']
+        check(isinstance(stats, dict), f'monster {name} stats are not a dict')
+        check(isinstance(data['abilities'], dict), f'monster {name} abilities are not a dict')
+        check(stats.get('element') in ELEMENTS, f'monster {name} has unknown element {stats.get("element")!r}')
+        for stat in STAT_NAMES:
+            check(isinstance(stats.get(stat), Real) and stats[stat] >= 0, f'monster {name} has invalid {stat} {stats.get(stat)!r}')
+        for level, attack in data['abilities'].items():
+            check(isinstance(level, int) and level >= 0, f'monster {name} learns {attack} at invalid level {level!r}')
+            check(attack in ATTACK_DATA, f'monster {name} learns unknown attack {attack!r}')
+        if data['evolve']:
+            check(isinstance(data['evolve'], tuple) and len(data['evolve']) == 2, f'monster {name} evolve is not a (monster, level) pair')
+            target, level = data['evolve']
+            check(target in MONSTER_DATA, f'monster {name} evolves into unknown monster {target!r}')
+            check(isinstance(level, int) and level >= 1, f'monster {name} evolves at invalid level {level!r}')
+    for name, data in CHARACTER_DATA.items():
+        check_keys(f'character {name}', data, ['dialog', 'directions', 'look_around', 'defeated'])
+        check(isinstance(data['dialog'], dict) and isinstance(data['dialog'].get('default'), list) and data['dialog']['default'], f'character {name} has no default dialog')
+        check(data['directions'] and set(data['directions']) <= set(DIRECTIONS), f'character {name} has invalid directions {data["directions"]!r}')
+        check(isinstance(data.get('monsters', {}), dict), f'character {name} monsters are not a dict')
+        check_team(f'character {name}', data.get('monsters', {}))
+    check_team('player', PLAYER_MONSTERS)
+
+# runs before any table below is built
+validate()
+
+# ids
+MONSTER_NAMES = list(MONSTER_DATA)
+MONSTER_IDS = {name: index for index, name in enumerate(MONSTER_NAMES)}
+ATTACK_NAMES = list(ATTACK_DATA)
+ATTACK_IDS = {name: index for index, name in enumerate(ATTACK_NAMES)}
+ELEMENT_IDS = {element: index for index, element in enumerate(ELEMENTS)}
+STATS = {stat: index for index, stat in enumerate(STAT_NAMES)}
+
+# monsters by id
+BASE_STATS = np.array([[MONSTER_DATA[name]['stats'][stat] for stat in STAT_NAMES] for name in MONSTER_NAMES], dtype = np.float32)
+MONSTER_ELEMENT = np.array([ELEMENT_IDS[MONSTER_DATA[name]['stats']['element']] for name in MONSTER_NAMES])
+
+# attacks by id
+ATTACK_AMOUNT = np.array([ATTACK_DATA[name]['amount'] for name in ATTACK_NAMES], dtype = np.float32)
+ATTACK_COST = np.array([ATTACK_DATA[name]['cost'] for name in ATTACK_NAMES], dtype = np.float32)
+ATTACK_ON_SELF = np.array([ATTACK_DATA[name]['target'] == 'player' for name in ATTACK_NAMES])
+ATTACK_ELEMENT = np.array([ELEMENT_IDS[ATTACK_DATA[name]['element']] for name in ATTACK_NAMES])
+
+# damage multiplier, attacking element by target element
+ELEMENT_MULTIPLIER = np.ones((len(ELEMENTS), len(ELEMENTS)), dtype = np.float32)
+for strong, weak in ELEMENT_STRENGTHS.items():
+    ELEMENT_MULTIPLIER[ELEMENT_IDS[strong], ELEMENT_IDS[weak]] = 2
+    ELEMENT_MULTIPLIER[ELEMENT_IDS[weak], ELEMENT_IDS[strong]] = 0.5
+
+# abilities: sorted learn levels per monster, and the attack ids known from each of those levels on
+ABILITY_LEVELS: list[tuple[int, ...]] = []
+KNOWN_ATTACKS: list[tuple[tuple[int, ...], ...]] = []
+# level each monster learns each attack at, inf if never
+UNLOCK_LEVEL = np.full((len(MONSTER_NAMES), len(ATTACK_NAMES)), np.inf, dtype = np.float32)
+for monster_id, name in enumerate(MONSTER_NAMES):
+    learned = sorted(MONSTER_DATA[name]['abilities'].items())
+    for level, attack in learned:
+        UNLOCK_LEVEL[monster_id, ATTACK_IDS[attack]] = min(level, UNLOCK_LEVEL[monster_id, ATTACK_IDS[attack]])
+    ABILITY_LEVELS.append(tuple(level for level, _ in learned))
+    KNOWN_ATTACKS.append(tuple(tuple(dict.fromkeys(ATTACK_IDS[attack] for _, attack in learned[:count])) for count in range(len(learned) + 1)))
+
+def known_attacks(monster_id, level) -> tuple[int, ...]:
+    """Attack ids a monster knows at a level, a prebuilt tuple so nothing is allocated"""
+    return KNOWN_ATTACKS[monster_id][bisect_right(ABILITY_LEVELS[monster_id], level)]
+
+# evolutions: next form and its level, -1 and 0 if there is none, and every form a monster can still become
+EVOLVES_TO = np.full(len(MONSTER_NAMES), -1, dtype = np.int16)
+EVOLVE_LEVEL = np.zeros(len(MONSTER_NAMES), dtype = np.int16)
+for monster_id, name in enumerate(MONSTER_NAMES):
+    if MONSTER_DATA[name]['evolve']:
+        target, level = MONSTER_DATA[name]['evolve']
+        EVOLVES_TO[monster_id], EVOLVE_LEVEL[monster_id] = MONSTER_IDS[target], level
+EVOLUTION_CHAIN: list[tuple[int, ...]] = []
+for monster_id, name in enumerate(MONSTER_NAMES):
+    chain = [monster_id]
+    while EVOLVES_TO[chain[-1]] >= 0:
+        check(EVOLVES_TO[chain[-1]] not in chain, f'monster {name} has an evolution cycle')
+        chain.append(int(EVOLVES_TO[chain[-1]]))
+    EVOLUTION_CHAIN.append(tuple(chain))
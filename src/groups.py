@@ -1,6 +1,9 @@
+from itertools import count
+from math import floor, ceil
 from settings import *
 from support import import_image
 from entities import Entity
+from spatial import SpatialGrid, DepthGrid, OccupancyGrid
 
 class AllSprites(pygame.sprite.Group):
     """Custom sprite group with camera """
@@ -10,21 +13,213 @@ class AllSprites(pygame.sprite.Group):
         self.offset = vector()
         self.shadow_surface = import_image('..','graphics','other','shadow')
         self.notice_surf = import_image('..', 'graphics', 'ui', 'notice')
+        # spatial index, kept in draw order
+        self.grid = DepthGrid()
+        self.pending: set[pygame.sprite.Sprite] = set()
+        self.entities: set[Entity] = set()
+        # sprites with their own update, everything else is static
+        self.animated: set[pygame.sprite.Sprite] = set()
+        # entities are bucketed separately so the ones near the player are cheap to find
+        self.entity_grid = SpatialGrid()
+        self.max_radius = 0
+        self.awake: list[Entity] = []
+        # entity centers before the last update, drawing can blend towards the current ones
+        self.previous: dict[Entity, tuple[float, float]] = {}
+        self.order: dict[pygame.sprite.Sprite, int] = {}
+        self.counter = count()
+        # what each sprite looked like on screen last frame, for dirty rect drawing
+        self.drawn: dict[pygame.sprite.Sprite, tuple] = {}
 
-    def draw(self, player) -> None:
-        self.offset.x = -1*(player.rect.centerx - WINDOW_WIDTH/2)
-        self.offset.y = -1*(player.rect.centery - WINDOW_HEIGHT/2)
-
-        bg_sprites = [sprite for sprite in self if sprite.z < WORLD_LAYERS['main']]
-        main_sprites = sorted( [sprite for sprite in self if sprite.z == WORLD_LAYERS['main']], 
-            key=lambda sprite: sprite.y_sort)
-        fg_sprites = [sprite for sprite in self if sprite.z > WORLD_LAYERS['main']]
-        
-        for layer in (bg_sprites, main_sprites, fg_sprites):
-            for sprite in layer:
-                if isinstance(sprite, Entity):
-                    self.display_surface.blit(self.shadow_surface, sprite.rect.topleft + self.offset + vector(40,110))
-                self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
-                if sprite == player and player.noticed:
-                    rect = self.notice_surf.get_frect(midbottom = sprite.rect.midtop)
-                    self.display_surface.blit(self.notice_surf, rect.topleft + self.offset)
\ No newline at end of file
+    def add_internal(self, sprite, layer = None) -> None:
+        super().add_internal(sprite, layer)
+        # sprites join their groups before their rect exists, so they are indexed on the next flush
+        self.order[sprite] = next(self.counter)
+        self.pending.add(sprite)
+        if isinstance(sprite, Entity):
+            self.entities.add(sprite)
+            self.max_radius = max(self.max_radius, getattr(sprite, 'radius', 0))
+        elif type(sprite).update is not pygame.sprite.Sprite.update:
+            self.animated.add(sprite)
+
+    def remove_internal(self, sprite) -> None:
+        super().remove_internal(sprite)
+        del self.order[sprite]
+        self.pending.discard(sprite)
+        self.entities.discard(sprite)
+        self.animated.discard(sprite)
+        self.entity_grid.remove(sprite)
+        self.grid.remove(sprite)
+
+    def depth(self, sprite) -> tuple:
+        y_sort = sprite.y_sort if sprite.z == WORLD_LAYERS['main'] else 0
+        return (sprite.z, y_sort, self.order[sprite])
+
+    def flush(self) -> None:
+        for sprite in sorted(self.pending, key=self.order.get):
+            self.grid.insert(sprite, sprite.rect, self.depth(sprite))
+            if sprite in self.entities:
+                self.entity_grid.insert(sprite, sprite.rect)
+        self.pending.clear()
+
+    def reindex(self, sprite) -> None:
+        """Moves a sprite in the grids after it was placed somewhere else outside of update"""
+        if sprite in self.pending or sprite not in self.order:
+            return
+        self.grid.move(sprite, sprite.rect, self.depth(sprite))
+        if sprite in self.entities:
+            self.entity_grid.move(sprite, sprite.rect)
+
+    def wake(self, player) -> list[Entity]:
+        """Entities that are on screen or have the player within their vision radius, in update order"""
+        view_rect = pygame.FRect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT).move_to(center = player.rect.center).inflate(ACTIVATION_MARGIN * 2, ACTIVATION_MARGIN * 2)
+        candidates = self.entity_grid.query(view_rect.inflate(self.max_radius * 2, self.max_radius * 2))
+        awake = [entity for entity in candidates if entity.rect.colliderect(view_rect) or \
+            vector(entity.rect.center).distance_to(player.rect.center) < getattr(entity, 'radius', 0) + ACTIVATION_MARGIN]
+        # the player is always awake, even if its grid entry is stale
+        if player in self.entities and player not in awake:
+            awake.append(player)
+        return sorted(awake, key = self.order.get)
+
+    def update(self, dt, player) -> None:
+        self.flush()
+        for sprite in self.animated:
+            sprite.update(dt)
+        # everything else sleeps until the player comes close, only awake entities can move or change y_sort
+        self.awake = self.wake(player)
+        self.previous = {entity: entity.rect.center for entity in self.awake}
+        for entity in self.awake:
+            entity.update(dt)
+        for entity in self.awake:
+            self.grid.move(entity, entity.rect, self.depth(entity))
+            self.entity_grid.move(entity, entity.rect)
+
+    def footprint(self, sprite, player) -> pygame.FRect:
+        """Screen area a sprite covers, its shadow and notice included"""
+        rect = sprite.rect.move(self.offset)
+        if isinstance(sprite, Entity):
+            rect = rect.union(self.shadow_surface.get_frect(topleft = rect.topleft + vector(40,110)))
+        if sprite == player and player.noticed:
+            rect = rect.union(self.notice_surf.get_frect(midbottom = rect.midtop))
+        return rect
+
+    def blit_sprites(self, sprites, player) -> None:
+        for sprite in sprites:
+            if isinstance(sprite, Entity):
+                self.display_surface.blit(self.shadow_surface, sprite.rect.topleft + self.offset + vector(40,110))
+            self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
+            if sprite == player and player.noticed:
+                rect = self.notice_surf.get_frect(midbottom = sprite.rect.midtop)
+                self.display_surface.blit(self.notice_surf, rect.topleft + self.offset)
+
+    def snapshot(self, view_rect, player) -> dict[pygame.sprite.Sprite, tuple]:
+        return {sprite: (tuple(self.footprint(sprite, player)), sprite.image) for sprite in self.grid.query(view_rect)}
+
+    def changed_rects(self, view_rect, player) -> list[pygame.FRect]:
+        """Screen rects of sprites that appeared, vanished, moved or changed image since the last frame"""
+        drawn = self.snapshot(view_rect, player)
+        rects = []
+        for sprite, state in drawn.items():
+            previous = self.drawn.pop(sprite, None)
+            if previous != state:
+                rects.append(pygame.FRect(state[0]))
+                if previous:
+                    rects.append(pygame.FRect(previous[0]))
+        # whatever is left was drawn last frame and is gone now
+        rects.extend(pygame.FRect(footprint) for footprint, _ in self.drawn.values())
+        self.drawn = drawn
+        return rects
+
+    def draw(self, player, full = True, extra_rects = (), alpha = 1) -> list[pygame.Rect]:
+        """Draws the world with entities alpha of the way from their previous to their current position"""
+        if alpha >= 1:
+            return self.draw_world(player, full, extra_rects)
+        current = {entity: entity.rect.center for entity in self.previous}
+        for entity, previous in self.previous.items():
+            entity.rect.center = vector(previous).lerp(current[entity], alpha)
+        rects = self.draw_world(player, full, extra_rects)
+        for entity, center in current.items():
+            entity.rect.center = center
+        return rects
+
+    def draw_world(self, player, full, extra_rects) -> list[pygame.Rect]:
+        """Draws the world and returns the screen rects that changed, only redrawing those unless full or the camera moved"""
+        self.flush()
+        offset = vector(-1*(player.rect.centerx - WINDOW_WIDTH/2), -1*(player.rect.centery - WINDOW_HEIGHT/2))
+        full = full or offset != self.offset
+        self.offset = offset
+        view_rect = pygame.FRect(-self.offset, (WINDOW_WIDTH, WINDOW_HEIGHT)).inflate(TILE_SIZE, TILE_SIZE)
+        screen_rect = self.display_surface.get_rect()
+
+        if full:
+            self.display_surface.fill('black')
+            self.blit_sprites(self.grid.query(view_rect), player)
+            if DIRTY_RECTS:
+                self.drawn = self.snapshot(view_rect, player)
+            return [screen_rect]
+
+        rects = []
+        for rect in [*self.changed_rects(view_rect, player), *extra_rects]:
+            rect = pygame.Rect(floor(rect.left), floor(rect.top), ceil(rect.width) + 1, ceil(rect.height) + 1).clip(screen_rect)
+            if rect:
+                rects.append(rect)
+        # merge overlapping rects so no area is drawn twice
+        merged = []
+        for rect in rects:
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect = rect.union(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+
+        for rect in merged:
+            self.display_surface.set_clip(rect)
+            self.display_surface.fill('black', rect)
+            self.blit_sprites(self.grid.query(pygame.FRect(rect).move(-self.offset)), player)
+        self.display_surface.set_clip(None)
+        return merged
+
+class CollisionSprites(pygame.sprite.Group):
+    """Sprite group with a broadphase grid over static hitboxes and a line of sight bitmap"""
+    def __init__(self) -> None:
+        super().__init__()
+        self.grid = SpatialGrid()
+        self.occupancy = OccupancyGrid(0, 0)
+        self.pending: set[pygame.sprite.Sprite] = set()
+        self.dynamic: set[Entity] = set()
+
+    def add_internal(self, sprite, layer = None) -> None:
+        super().add_internal(sprite, layer)
+        # characters move, so they are always tested instead of being bucketed
+        if isinstance(sprite, Entity):
+            self.dynamic.add(sprite)
+        else:
+            self.pending.add(sprite)
+
+    def remove_internal(self, sprite) -> None:
+        super().remove_internal(sprite)
+        self.pending.discard(sprite)
+        self.dynamic.discard(sprite)
+        self.grid.remove(sprite)
+
+    def set_bounds(self, width, height) -> None:
+        """Starts a fresh line of sight bitmap for a map of the given size"""
+        self.occupancy = OccupancyGrid(width, height)
+        for sprite in self.grid.keys:
+            self.occupancy.mark(sprite.rect)
+
+    def flush(self) -> None:
+        for sprite in self.pending:
+            self.grid.insert(sprite, sprite.hitbox)
+            self.occupancy.mark(sprite.rect)
+        self.pending.clear()
+
+    def line_blocked(self, start, end, exclude = None) -> bool:
+        self.flush()
+        if self.occupancy.raycast(start, end):
+            return True
+        return any(sprite.rect.clipline(start, end) for sprite in self.dynamic if sprite is not exclude)
+
+    def nearby(self, rect) -> set:
+        """Returns the sprites whose hitbox could overlap rect"""
+        self.flush()
+        return self.grid.query(rect) | self.dynamic
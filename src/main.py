@@ -1,44 +1,50 @@
 from settings import *
 from pytmx.util_pygame import load_pygame
 from pytmx import TiledMap
-from os.path import join
+from os.path import join, exists
+from concurrent.futures import ThreadPoolExecutor
 import os
-from pyinstrument import Profiler
 
-from sprites import Sprite, AnimatedSprite, MonsterPatchSprite, BorderSprite, CollidableSprite, TransitionSprite
+from sprites import Sprite, ChunkSprite, AnimatedChunkSprite, MonsterPatchSprite, BorderSprite, CollidableSprite, TransitionSprite
 from entities import Player, Character
-from groups import AllSprites
+from scene import Scene, SceneCache
 from dialog import DialogTree
+from timer import Timer, scheduler
 from support import *
-from monster import Monster
+from atlas import ATLAS_PATH, ATLAS_SOURCES
+from monster import Monster, Roster
+from save import SaveState, snapshot_roster, write_save, read_save
 from monster_index import MonsterIndex
 
-from game_data import CHARACTER_DATA
+from game_data import CHARACTER_DATA, PLAYER_MONSTERS
 from debug import debug
+from audio import Audio
+from telemetry import FrameTimer, HitchProfiler
 
 class Game:
-    def __init__(self) -> None:
+    def __init__(self, save_path = SAVE_PATH) -> None:
         working_dir = os.path.dirname(__file__)
         os.chdir(working_dir)
         pygame.init()
-        self.display_surface = pygame.display.set_mode((WINDOW_WIDTH,WINDOW_HEIGHT))
+        if VSYNC:
+            # vsync needs a renderer behind the window, which SCALED provides
+            self.display_surface = pygame.display.set_mode((WINDOW_WIDTH,WINDOW_HEIGHT), pygame.SCALED, vsync = 1)
+        else:
+            self.display_surface = pygame.display.set_mode((WINDOW_WIDTH,WINDOW_HEIGHT))
         pygame.display.set_caption('Monster Hunter')
         self.clock = pygame.time.Clock()
         # player monsters
-        self.player_monsters = {
-            0: Monster('Ivieron', 32),
-            1: Monster('Atrox', 15),
-            2: Monster('Cindrill', 16),
-            3: Monster('Atrox', 10),
-            4: Monster('Sparchu', 11),
-            5: Monster('Gulfin', 9),
-            6: Monster('Jacana', 10),
-        }
-        # groups
-        self.all_sprites = AllSprites()
-        self.collision_sprites = pygame.sprite.Group()
-        self.character_sprites = pygame.sprite.Group()
-        self.transition_sprites = pygame.sprite.Group()
+        self.monster_roster = Roster()
+        self.player_monsters = {index: Monster(name, level, self.monster_roster) for index, (name, level) in PLAYER_MONSTERS.items()}
+        # scenes
+        self.scene_cache = SceneCache()
+        self.player_start_pos = None
+        # saving, written on a worker thread, None turns saving and loading off
+        self.save_path = join(*save_path) if save_path else None
+        self.save_executor = ThreadPoolExecutor(max_workers = 1)
+        self.save_future = None
+        self.moved_characters: set[str] = set()
+        self.save_error = None
 
         # transition / tint
         self.transition_target = None
@@ -49,16 +55,32 @@ class Game:
         self.tint_speed = 600
 
         self.import_assets()
-        # self.setup(self.tmx_maps['hospital'], 'world')
-        self.setup(self.tmx_maps['world'], 'house')
+        # audio, music streams from disk and the notice sound decodes in the background
+        self.audio = Audio('..', 'audio')
+        self.audio.prefetch('notice')
+        self.audio.play_music('overworld')
+        self.player_noticed = False
+        if not self.load_game():
+            # self.load_map('hospital', 'world')
+            self.load_map('world', 'house')
+        self.autosave_timer = Timer(AUTOSAVE_INTERVAL, True, bool(self.save_path), self.autosave)
 
         # overlays
         self.dialog_tree = None
         self.monster_index = MonsterIndex(self.player_monsters, self.fonts, self.monster_frames)
         self.index_open = False
+        # instrumentation
+        self.frame_timer = FrameTimer(['timers', 'input', 'transition_check', 'update', 'draw', 'dialog', 'index', 'debug', 'tint_screen', 'telemetry', 'display'])
+        self.hitch_profiler = HitchProfiler() if HITCH_CAPTURE else None
+        # dirty rect drawing
+        self.full_redraw = True
+        self.overlay_rects = []
+        self.dirty_rects = None
 
     def import_assets(self) -> None:
-        self.tmx_maps: dict[TiledMap] = tmx_importer('..','data', 'maps')
+        load_atlas(*ATLAS_PATH)
+        preload(*ATLAS_SOURCES, ('..','graphics','fonts'))
+        self.tmx_maps = TmxMaps('..','data', 'maps')
 
         self.overworld_frames = {
             'water': import_folder('..','graphics','tilesets','water'),
@@ -67,24 +89,54 @@ class Game:
         # print(self.overworld_frames['characters']['blond'])
 
         self.fonts: dict[pygame.Font] = {
-            'dialog': pygame.font.Font(join('..','graphics', 'fonts', 'PixeloidSans.ttf'), 30),
-            'regular': pygame.font.Font(join('..','graphics', 'fonts', 'PixeloidSans.ttf'), 18),
-            'small': pygame.font.Font(join('..','graphics', 'fonts', 'PixeloidSans.ttf'), 14),
-            'bold': pygame.font.Font(join('..','graphics', 'fonts', 'dogicapixelbold.otf'), 20)
+            'dialog': import_font('..','graphics', 'fonts', 'PixeloidSans.ttf', size = 30),
+            'regular': import_font('..','graphics', 'fonts', 'PixeloidSans.ttf', size = 18),
+            'small': import_font('..','graphics', 'fonts', 'PixeloidSans.ttf', size = 14),
+            'bold': import_font('..','graphics', 'fonts', 'dogicapixelbold.otf', size = 20)
             }
         self.monster_frames: dict[dict[Surface]] = {
             'icons' : import_folder_dict('..','graphics','icons'),
             'monsters': monster_importer(4, 2,'..','graphics', 'monsters')
         }
 
+    def load_map(self, name, player_start_pos) -> None:
+        self.player_start_pos = player_start_pos
+        scene = self.scene_cache.get(name)
+        if scene:
+            self.enter_scene(scene)
+            for obj in self.tmx_maps[name].get_layer_by_name('Entities'):
+                if obj.name == 'Player' and obj.properties['pos'] == player_start_pos:
+                    self.player.respawn((obj.x, obj.y), obj.properties['direction'])
+                    self.all_sprites.reindex(self.player)
+        else:
+            scene = Scene(name)
+            self.enter_scene(scene)
+            self.setup(self.tmx_maps[name], player_start_pos)
+            scene.player = self.player
+            self.scene_cache.put(scene)
+        self.tmx_maps.prefetch_neighbours(name)
+
+    def enter_scene(self, scene:Scene) -> None:
+        self.scene = scene
+        self.all_sprites = scene.all_sprites
+        self.collision_sprites = scene.collision_sprites
+        self.character_sprites = scene.character_sprites
+        self.transition_sprites = scene.transition_sprites
+        self.player = scene.player
+        # positions from the last visit would be blended with the respawn
+        self.all_sprites.previous.clear()
+
     def setup(self, tmx_map:TiledMap, player_start_pos) -> None:
         # clear the map
         for group in (self.all_sprites, self.collision_sprites, self.transition_sprites, self.character_sprites):
             group.empty()
-        # Terrain Tiles
-        for layer in ['Terrain', 'Terrain Top']:
-            for x,y,surf in tmx_map.get_layer_by_name(layer).tiles():
-                Sprite((x*TILE_SIZE,y*TILE_SIZE), surf, self.all_sprites, WORLD_LAYERS['bg'])
+        self.collision_sprites.set_bounds(tmx_map.width * TILE_SIZE, tmx_map.height * TILE_SIZE)
+        # Terrain Tiles (chunks, baked lazily near the camera)
+        terrain_tiles = [((x*TILE_SIZE,y*TILE_SIZE), surf) for layer in ['Terrain', 'Terrain Top'] \
+                        for x,y,surf in tmx_map.get_layer_by_name(layer).tiles()]
+        chunk_size = CHUNK_SIZE * TILE_SIZE
+        for (cx,cy), layout in chunk_layouts(terrain_tiles, chunk_size).items():
+            ChunkSprite((cx*chunk_size,cy*chunk_size), chunk_size, layout, self.all_sprites, WORLD_LAYERS['bg'])
         # Objects
         for obj in tmx_map.get_layer_by_name('Objects'):
             if obj.name =='top': 
@@ -105,19 +157,20 @@ class Game:
         # Grass Patches
         for obj in tmx_map.get_layer_by_name('Monsters'):
             MonsterPatchSprite((obj.x,obj.y), obj.image, self.all_sprites, obj.properties['biome'])
-        # Water
-        for obj in tmx_map.get_layer_by_name('Water'):
-            for x in range(int(obj.x), int(obj.x + obj.width), TILE_SIZE):
-                for y in range(int(obj.y), int(obj.y + obj.height), TILE_SIZE):
-                    AnimatedSprite((x,y), self.overworld_frames['water'], self.all_sprites, WORLD_LAYERS['water'])
-        # Coast
-        for obj in tmx_map.get_layer_by_name('Coast'):
-            side = obj.properties['side']
-            terrain = obj.properties['terrain']
-            AnimatedSprite((obj.x,obj.y), self.overworld_frames['coast'][terrain][side], self.all_sprites, WORLD_LAYERS['bg'])
-
-        # Entities
-        for obj in tmx_map.get_layer_by_name('Entities'):
+        # Water (animated chunks)
+        water_tiles = [((x,y), self.overworld_frames['water']) for obj in tmx_map.get_layer_by_name('Water') \
+                        for x in range(int(obj.x), int(obj.x + obj.width), TILE_SIZE) \
+                        for y in range(int(obj.y), int(obj.y + obj.height), TILE_SIZE)]
+        for (cx,cy), layouts in animated_chunk_layouts(water_tiles, chunk_size).items():
+            AnimatedChunkSprite((cx*chunk_size,cy*chunk_size), chunk_size, layouts, self.all_sprites, WORLD_LAYERS['water'])
+        # Coast (animated chunks)
+        coast_tiles = [((obj.x,obj.y), self.overworld_frames['coast'][obj.properties['terrain']][obj.properties['side']]) \
+                        for obj in tmx_map.get_layer_by_name('Coast')]
+        for (cx,cy), layouts in animated_chunk_layouts(coast_tiles, chunk_size).items():
+            AnimatedChunkSprite((cx*chunk_size,cy*chunk_size), chunk_size, layouts, self.all_sprites, WORLD_LAYERS['bg'])
+
+        # Entities (the player first, characters keep a reference to it)
+        for obj in sorted(tmx_map.get_layer_by_name('Entities'), key = lambda obj: obj.name != 'Player'):
             if obj.name == 'Player' and obj.properties['pos'] == player_start_pos:
                 self.player = Player(
                     pos= (obj.x, obj.y), 
@@ -127,16 +180,21 @@ class Game:
                     collision_sprites = self.collision_sprites)
             
             elif obj.name == 'Character' :
-                Character(
+                character = Character(
                     pos= (obj.x, obj.y),
                     facing_direction= obj.properties['direction'],
                     frames= self.overworld_frames['characters'][obj.properties['graphic']],
                     groups= [self.all_sprites, self.collision_sprites, self.character_sprites], 
+                    character_id= obj.properties['character_id'],
                     character_data= CHARACTER_DATA[obj.properties['character_id']],
                     player=self.player,
                     create_dialog=self.create_dialog,
                     collision_sprites=self.collision_sprites,
                     radius= obj.properties['radius'])
+                # trainers that already walked up to the player don't do it again, positions aren't saved so they stand at their spawn
+                if character.character_id in self.moved_characters:
+                    character.has_moved = True
+                    character.can_rotate = False
     
     # Dialog System
     def input(self) -> None:
@@ -154,13 +212,58 @@ class Game:
                 self.player.blocked = not self.player.blocked
 
     def create_dialog(self, character) -> None:
+        if character.has_moved:
+            self.moved_characters.add(character.character_id)
         if not self.dialog_tree:
             self.dialog_tree = DialogTree(character, self.player, self.all_sprites, self.fonts['dialog'], self.end_dialog)
 
     def end_dialog(self, character) -> None:
         self.dialog_tree = None
         self.player.unblock()
+        if character.character_data is CHARACTER_DATA['Nurse']:
+            self.monster_roster.heal()
     
+    # Save System
+    def snapshot(self) -> SaveState:
+        columns, roster_size = snapshot_roster(self.monster_roster)
+        return SaveState(
+            map_name = self.scene.name,
+            player_start_pos = self.player_start_pos,
+            position = tuple(self.player.rect.center),
+            facing_direction = self.player.facing_direction,
+            columns = columns,
+            roster_size = roster_size,
+            party = tuple(monster.id for _, monster in sorted(self.player_monsters.items())),
+            defeated = tuple(name for name, data in CHARACTER_DATA.items() if data['defeated']),
+            moved = tuple(sorted(self.moved_characters)))
+
+    def autosave(self) -> None:
+        # a write still in flight means the disk is slow, the next autosave catches up
+        if self.save_future and not self.save_future.done():
+            return
+        self.save_future = self.save_executor.submit(write_save, self.snapshot(), self.save_path)
+
+    def load_game(self) -> bool:
+        if not self.save_path or not exists(self.save_path):
+            return False
+        try:
+            state, roster = read_save(self.save_path, self.tmx_maps)
+        except ValueError as error:
+            # start a new game, the unusable save is moved aside instead of being overwritten by the next autosave
+            self.save_error = str(error)
+            os.replace(self.save_path, self.save_path + '.bad')
+            return False
+        self.monster_roster = roster
+        self.player_monsters = {index: Monster.from_roster(roster, monster_id) for index, monster_id in enumerate(state.party)}
+        for name in state.defeated:
+            if name in CHARACTER_DATA:
+                CHARACTER_DATA[name]['defeated'] = True
+        self.moved_characters = set(state.moved)
+        self.load_map(state.map_name, state.player_start_pos)
+        self.player.respawn(state.position, state.facing_direction)
+        self.all_sprites.reindex(self.player)
+        return True
+
     # Transition System
     def transition_check(self) -> None:
         sprites = [sprite for sprite in self.transition_sprites if sprite.rect.colliderect(self.player.hitbox)]
@@ -176,45 +279,93 @@ class Game:
         if self.tint_mode == 'tint':
             self.tint_progress += self.tint_speed * dt
             if self.tint_progress >= 255:
-                self.setup(self.tmx_maps[self.transition_target[0]], self.transition_target[1])
+                self.load_map(*self.transition_target)
                 self.tint_mode = 'untint'
                 self.transition_target = None
         self.tint_progress = max(0, min(self.tint_progress, 255))
-        self.tint_surface.set_alpha(self.tint_progress)
-        self.display_surface.blit(self.tint_surface, (0,0))
+        if self.tint_progress:
+            self.tint_surface.set_alpha(self.tint_progress)
+            self.display_surface.blit(self.tint_surface, (0,0))
+
+    def update(self, dt) -> None:
+        self.input()
+        self.frame_timer.mark('input')
+        self.step(dt)
+
+    def step(self, dt) -> None:
+        """Advances the simulation by dt, without reading one shot input"""
+        scheduler.update()
+        self.frame_timer.mark('timers')
+        self.transition_check()
+        self.frame_timer.mark('transition_check')
+        self.all_sprites.update(dt, self.player)
+        if self.player.noticed and not self.player_noticed:
+            self.audio.play('notice')
+        self.player_noticed = self.player.noticed
+        self.frame_timer.mark('update')
+
+    def draw(self, dt, alpha = 1) -> None:
+        # overlays from last frame are covered by redrawing the world under them
+        rects = self.all_sprites.draw(self.player, not DIRTY_RECTS or self.full_redraw, self.overlay_rects, alpha)
+        self.frame_timer.mark('draw')
+        
+        # overlays
+        if self.dialog_tree: self.dialog_tree.update()
+        self.frame_timer.mark('dialog')
+        if self.index_open: self.monster_index.update(dt)
+        self.frame_timer.mark('index')
+        debug_rect = debug(f'{self.clock.get_fps():.2f}')
+        self.frame_timer.mark('debug')
+        self.tint_screen(dt)
+        self.frame_timer.mark('tint_screen')
+        telemetry_rect = self.frame_timer.draw(self.display_surface, self.fonts['small'])
+        self.frame_timer.mark('telemetry')
+
+        # full screen overlays make this frame and the next one full redraws
+        self.full_redraw = self.index_open or self.tint_progress > 0
+        self.overlay_rects = [rect for rect in (debug_rect, telemetry_rect) if rect]
+        self.dirty_rects = None if self.full_redraw else rects + self.overlay_rects
 
     def run(self) -> None:
-        # profiler = Profiler()
-        # profiler.start()
+        accumulator = 0
         while True:
-            self.display_surface.fill('black')
-            dt = self.clock.tick() / 1000
+            dt = self.clock.tick(0 if VSYNC else FRAME_CAP) / 1000
             # limit the size of dt to prevent issues when moving the window
             max_dt = 0.1
             dt = min(dt, max_dt)
             # event loop
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    # profiler.stop()
-                    # profiler.print()
+                    if self.save_path:
+                        self.save_executor.submit(write_save, self.snapshot(), self.save_path)
+                    self.save_executor.shutdown()
+                    self.audio.close()
+                    self.tmx_maps.close()
+                    self.frame_timer.close()
+                    if self.hitch_profiler: self.hitch_profiler.close()
                     pygame.quit()
                     exit()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.frame_timer.toggle()
 
-            # update
-            self.input()
-            self.transition_check()
-            self.all_sprites.update(dt)
-            
-            # drawing
-            self.all_sprites.draw(self.player)
-            
-            # overlays
-            if self.dialog_tree: self.dialog_tree.update()
-            if self.index_open: self.monster_index.update(dt)
-            debug(f'{self.clock.get_fps():.2f}')
-            self.tint_screen(dt)
-            pygame.display.update()
-
+            self.frame_timer.begin()
+            if FIXED_TIMESTEP:
+                # input is read once per frame, the simulation catches up in fixed steps
+                self.input()
+                self.frame_timer.mark('input')
+                accumulator += dt
+                while accumulator >= FIXED_TIMESTEP:
+                    self.step(FIXED_TIMESTEP)
+                    accumulator -= FIXED_TIMESTEP
+                self.draw(dt, accumulator / FIXED_TIMESTEP)
+            else:
+                self.update(dt)
+                self.draw(dt)
+            pygame.display.update(self.dirty_rects)
+            self.frame_timer.mark('display')
+            if self.hitch_profiler:
+                self.hitch_profiler.end_frame(self.frame_timer.frame_time(), self.scene.name, self.player.rect.center)
+            self.frame_timer.end()
 
 
 if __name__ == '__main__':
@@ -1,14 +1,126 @@
+import numpy as np
 from game_data import MONSTER_DATA
+from game_tables import MONSTER_NAMES, MONSTER_IDS, ATTACK_NAMES, ELEMENTS, STATS, BASE_STATS, MONSTER_ELEMENT, known_attacks
 from random import randint
 
+ROSTER_COLUMNS = ['name_id', 'level', 'xp', 'health', 'energy']
+
+class Roster():
+    """Struct of arrays store for many monsters, stats are derived for the whole roster at once"""
+    def __init__(self, capacity = 16) -> None:
+        self.size = 0
+        self.name_id = np.zeros(capacity, dtype = np.int16)
+        self.level = np.zeros(capacity, dtype = np.int16)
+        self.xp = np.zeros(capacity, dtype = np.int32)
+        self.health = np.zeros(capacity, dtype = np.float32)
+        self.energy = np.zeros(capacity, dtype = np.float32)
+
+    def add(self, name, level, xp) -> int:
+        """Stores a fully healed monster and returns its id"""
+        if self.size == len(self.level):
+            # grow by doubling so adding stays amortised constant time
+            for column in ROSTER_COLUMNS:
+                array = getattr(self, column)
+                setattr(self, column, np.concatenate([array, np.zeros_like(array)]))
+        index = self.size
+        self.size += 1
+        self.name_id[index] = MONSTER_IDS[name]
+        self.level[index] = level
+        self.xp[index] = xp
+        self.heal(index)
+        return index
+
+    def ids(self, ids = None):
+        return slice(0, self.size) if ids is None else ids
+
+    def stats(self, ids = None) -> np.ndarray:
+        """Level scaled stats, one row per monster and one column per STAT_NAMES entry"""
+        ids = self.ids(ids)
+        return BASE_STATS[self.name_id[ids]] * self.level[ids, None]
+
+    def stat(self, stat, ids = None) -> np.ndarray:
+        ids = self.ids(ids)
+        return BASE_STATS[self.name_id[ids], STATS[stat]] * self.level[ids]
+
+    def level_up(self, ids = None) -> np.ndarray:
+        """xp needed for the next level"""
+        return self.level[self.ids(ids)] * 150
+
+    def heal(self, ids = None) -> None:
+        """Restores health and energy, of the whole roster unless ids are given"""
+        ids = self.ids(ids)
+        self.health[ids] = self.stat('max_health', ids)
+        self.energy[ids] = self.stat('max_energy', ids)
+
+    def memory_size(self) -> int:
+        return sum(getattr(self, column).nbytes for column in ROSTER_COLUMNS)
+
 class Monster():
-    """Data class for monster"""
-    def __init__(self, name, level) -> None:
-        self.name = name
-        self.level = level
-        # stats
-        self.element = MONSTER_DATA[name]['stats']['element']
-        self.base_stats = MONSTER_DATA[name]['stats']
-        # experience
-        self.xp = randint(0,1000)
-        self.level_up = self.level * 150
\ No newline at end of file
+    """View of one monster in a roster"""
+    __slots__ = ('roster', 'id')
+
+    def __init__(self, name, level, roster) -> None:
+        self.roster = roster
+        self.id = roster.add(name, level, randint(0,1000))
+
+    @classmethod
+    def from_roster(cls, roster, monster_id) -> 'Monster':
+        """View of a monster that is already stored in roster"""
+        monster = cls.__new__(cls)
+        monster.roster, monster.id = roster, monster_id
+        return monster
+
+    @property
+    def name(self) -> str:
+        return MONSTER_NAMES[self.roster.name_id[self.id]]
+
+    @property
+    def base_stats(self) -> dict:
+        return MONSTER_DATA[self.name]['stats']
+
+    @property
+    def element(self) -> str:
+        return ELEMENTS[MONSTER_ELEMENT[self.roster.name_id[self.id]]]
+
+    @property
+    def abilities(self) -> list[str]:
+        return [ATTACK_NAMES[attack] for attack in known_attacks(self.roster.name_id[self.id], self.level)]
+
+    @property
+    def level(self) -> int:
+        return int(self.roster.level[self.id])
+
+    @level.setter
+    def level(self, value) -> None:
+        self.roster.level[self.id] = value
+
+    @property
+    def xp(self) -> int:
+        return int(self.roster.xp[self.id])
+
+    @xp.setter
+    def xp(self, value) -> None:
+        self.roster.xp[self.id] = value
+
+    @property
+    def level_up(self) -> int:
+        return self.level * 150
+
+    @property
+    def health(self) -> float:
+        return float(self.roster.health[self.id])
+
+    @health.setter
+    def health(self, value) -> None:
+        self.roster.health[self.id] = value
+
+    @property
+    def energy(self) -> float:
+        return float(self.roster.energy[self.id])
+
+    @energy.setter
+    def energy(self, value) -> None:
+        self.roster.energy[self.id] = value
+
+    def get_stat(self, stat) -> float:
+        return float(self.roster.stat(stat, self.id))
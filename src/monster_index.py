@@ -2,6 +2,7 @@ import pygame.freetype
 from settings import *
 from random import choice
 from support import draw_bar
+from text_cache import text_cache
 
 class MonsterIndex():
     """Creates an index to manage and store Monsters"""
@@ -13,6 +14,7 @@ class MonsterIndex():
         # frames
         self.icon_frames = frames['icons']
         self.monster_frames = frames['monsters']
+        self.highlight_icons = {}
         # tint surf
         self.tint_surf = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
         self.tint_surf.set_alpha(200)
@@ -24,6 +26,16 @@ class MonsterIndex():
         self.item_height = self.main_rect.height / self.visible_items
         self.index = 0
         self.selected_index = None
+        # retained panels, drawn in main_rect coordinates and rebuilt when state() changes
+        self.panel_rect = pygame.FRect((0, 0), self.main_rect.size)
+        self.panel_surf = pygame.Surface(self.main_rect.size, pygame.SRCALPHA)
+        self.labels_surf = pygame.Surface(self.main_rect.size, pygame.SRCALPHA)
+        self.shadow_surf = pygame.Surface((4, self.main_rect.height))
+        self.shadow_surf.set_alpha(100)
+        self.panel_state = None
+        self.detail_rect = pygame.FRect(self.panel_rect.left + self.list_width, self.panel_rect.top, \
+                                        self.panel_rect.width - self.list_width, self.panel_rect.height)
+        self.top_rect = pygame.FRect(self.detail_rect.topleft,(self.detail_rect.width, self.detail_rect.width* 0.4))
 
     def input(self):
         keys = pygame.key.get_just_pressed()
@@ -46,6 +58,11 @@ class MonsterIndex():
         self.index = self.index % len(self.monsters)
 
 
+    def state(self) -> tuple:
+        """Everything the cached panels depend on"""
+        party = tuple((index, id(monster), monster.name, monster.level, monster.xp) for index, monster in self.monsters.items())
+        return (self.index, self.selected_index, party)
+
     def display_list(self) -> None:
         v_offset = 0 if self.index < self.visible_items else -1*(self.index - self.visible_items+1) * self.item_height
         scale_factor = 1.2
@@ -55,73 +72,64 @@ class MonsterIndex():
             # colors
             bg_color = COLORS['gray'] if not highlighted else COLORS['light']
             text_color = COLORS['white'] if self.selected_index != index else COLORS['gold']
-            top = self.main_rect.top + index * self.item_height + v_offset
+            top = self.panel_rect.top + index * self.item_height + v_offset
             
-            item_rect = pygame.FRect(self.main_rect.left,top,self.list_width, self.item_height)
+            item_rect = pygame.FRect(self.panel_rect.left,top,self.list_width, self.item_height)
             # item_rect = item_rect if not highlighted else item_rect.inflate(10,0)
-            item_rect.left = self.main_rect.left
+            item_rect.left = self.panel_rect.left
 
             
-            text_surf = self.fonts['regular'].render(monster.name, False, text_color)
-            text_surf = text_surf if not highlighted else pygame.transform.scale_by(text_surf,scale_factor) 
+            text_surf = text_cache.render(self.fonts['regular'], monster.name, text_color, scale = scale_factor if highlighted else 1)
             text_rect = text_surf.get_frect(midleft = item_rect.midleft + vector(90, 0))
 
             icon_surf = self.icon_frames[monster.name]
-            icon_surf = icon_surf if not highlighted else pygame.transform.scale_by(icon_surf,scale_factor)
+            if highlighted:
+                if monster.name not in self.highlight_icons:
+                    self.highlight_icons[monster.name] = pygame.transform.scale_by(icon_surf,scale_factor)
+                icon_surf = self.highlight_icons[monster.name]
             icon_rect = icon_surf.get_frect(center = item_rect.midleft + vector(45,0))
             
-            if item_rect.colliderect(self.main_rect):
+            if item_rect.colliderect(self.panel_rect):
                 # check corners
-                if item_rect.collidepoint(self.main_rect.topleft):
-                    pygame.draw.rect(self.display_surface, bg_color, item_rect, 0,0,12)
-                elif item_rect.collidepoint(self.main_rect.bottomleft + vector(1,-1)):
-                    pygame.draw.rect(self.display_surface, bg_color, item_rect, 0,0,0,0,12,0)
+                if item_rect.collidepoint(self.panel_rect.topleft):
+                    pygame.draw.rect(self.panel_surf, bg_color, item_rect, 0,0,12)
+                elif item_rect.collidepoint(self.panel_rect.bottomleft + vector(1,-1)):
+                    pygame.draw.rect(self.panel_surf, bg_color, item_rect, 0,0,0,0,12,0)
                 else:
-                    pygame.draw.rect(self.display_surface, bg_color, item_rect)
-                self.display_surface.blit(text_surf, text_rect)
-                self.display_surface.blit(icon_surf, icon_rect)
+                    pygame.draw.rect(self.panel_surf, bg_color, item_rect)
+                self.panel_surf.blit(text_surf, text_rect)
+                self.panel_surf.blit(icon_surf, icon_rect)
         
         # lines
         for i in range(min(self.visible_items - 1, len(self.monsters) -1)):
-            y = (i + 1) * self.item_height + self.main_rect.top
-            left = self.main_rect.left
-            right = self.main_rect.left + self.list_width
-            pygame.draw.line(self.display_surface, COLORS['light-gray'], (left, y), (right, y))    
+            y = (i + 1) * self.item_height + self.panel_rect.top
+            left = self.panel_rect.left
+            right = self.panel_rect.left + self.list_width
+            pygame.draw.line(self.panel_surf, COLORS['light-gray'], (left, y), (right, y))    
 
         # shadow
-        shadow_surf = pygame.Surface((4, self.main_rect.height))
-        shadow_surf.set_alpha(100)
-        self.display_surface.blit(shadow_surf, (self.main_rect.left + self.list_width-4, self.main_rect.top))
+        self.panel_surf.blit(self.shadow_surf, (self.panel_rect.left + self.list_width-4, self.panel_rect.top))
     
-    def display_main(self,dt) -> None:
+    def display_main(self) -> None:
         # data
         monster = self.monsters[self.index]
         
         # main bg
-        rect = pygame.FRect(self.main_rect.left + self.list_width, self.main_rect.top, \
-                            self.main_rect.width - self.list_width, self.main_rect.height)
-        pygame.draw.rect(self.display_surface, COLORS['dark'], rect, 0, 12, 0, 12, 0)
+        pygame.draw.rect(self.panel_surf, COLORS['dark'], self.detail_rect, 0, 12, 0, 12, 0)
         # monster display
-        top_rect = pygame.FRect(rect.topleft,(rect.width, rect.width* 0.4))
-        pygame.draw.rect(self.display_surface, COLORS[monster.element], top_rect, 0,0,0,12)
-        # monster animation
-        self.frame_index += ANIMATION_SPEED * dt
-        frames = self.monster_frames[monster.name]
-        state = 'attack' if self.frame_index <= len(frames['attack']) else 'idle'
-        monster_surf = frames[state][int(self.frame_index)%len(frames[state])]
-        monster_rect = monster_surf.get_frect(center = top_rect.center)
-        self.display_surface.blit(monster_surf, monster_rect)
+        top_rect = self.top_rect
+        pygame.draw.rect(self.panel_surf, COLORS[monster.element], top_rect, 0,0,0,12)
         # name
-        name_surf: pygame.Surface = self.fonts['bold'].render(monster.name, False, COLORS['white'])
+        name_surf: pygame.Surface = text_cache.render(self.fonts['bold'], monster.name, COLORS['white'])
         name_rect = name_surf.get_frect(topleft = top_rect.topleft + vector(10,10))
-        self.display_surface.blit(name_surf, name_rect)
+        self.labels_surf.blit(name_surf, name_rect)
         # level
-        level_surf: pygame.Surface = self.fonts['regular'].render(f'Lvl: {monster.level}', False, COLORS['white'])
+        level_surf: pygame.Surface = text_cache.render(self.fonts['regular'], f'Lvl: {monster.level}', COLORS['white'])
         level_rect = level_surf.get_frect(bottomleft = top_rect.bottomleft + vector(10,-10))
-        self.display_surface.blit(level_surf, level_rect)
+        self.labels_surf.blit(level_surf, level_rect)
         # XP bar
         draw_bar(
-            surface=self.display_surface,
+            surface=self.labels_surf,
             rect=pygame.FRect(level_rect.bottomleft, (100, 4)),
             value= monster.xp, 
             max_value= monster.level_up, 
@@ -129,14 +137,30 @@ class MonsterIndex():
             bg_color= COLORS['dark'], 
             radius= 1)
         # element
-        element_surf: pygame.Surface = self.fonts['regular'].render(monster.element, False, COLORS['white'])
+        element_surf: pygame.Surface = text_cache.render(self.fonts['regular'], monster.element, COLORS['white'])
         element_rect = element_surf.get_frect(bottomright = top_rect.bottomright + vector(-10,-10))
-        self.display_surface.blit(element_surf, element_rect)
+        self.labels_surf.blit(element_surf, element_rect)
+
+    def display_monster(self, dt) -> None:
+        monster = self.monsters[self.index]
+        self.frame_index += ANIMATION_SPEED * dt
+        frames = self.monster_frames[monster.name]
+        state = 'attack' if self.frame_index <= len(frames['attack']) else 'idle'
+        monster_surf = frames[state][int(self.frame_index)%len(frames[state])]
+        monster_rect = monster_surf.get_frect(center = self.top_rect.center + vector(self.main_rect.topleft))
+        self.display_surface.blit(monster_surf, monster_rect)
+
     def update(self, dt) -> None:
         self.input()
+        state = self.state()
+        if state != self.panel_state:
+            self.panel_state = state
+            self.panel_surf.fill((0, 0, 0, 0))
+            self.labels_surf.fill((0, 0, 0, 0))
+            self.display_list()
+            self.display_main()
         self.display_surface.blit(self.tint_surf, (0,0))
-        # pygame.draw.rect(self.display_surface, 'black', self.main_rect)
-        self.display_list()
-        self.display_main(dt)
-        # display the main section
-        
\ No newline at end of file
+        self.display_surface.blit(self.panel_surf, self.main_rect.topleft)
+        self.display_monster(dt)
+        # labels go over the monster animation
+        self.display_surface.blit(self.labels_surf, self.main_rect.topleft)
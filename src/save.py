@@ -0,0 +1,98 @@
+import os
+import numpy as np
+from os.path import dirname
+from struct import pack, unpack_from, calcsize, error as struct_error
+from typing import NamedTuple
+from binary import write_string, read_string
+from game_tables import MONSTER_NAMES, MONSTER_IDS, DIRECTIONS
+from monster import Roster, ROSTER_COLUMNS
+
+# save layout: header, monster name table, map, player, roster columns, party ids, defeated and moved characters
+SAVE_MAGIC = b'MHSV'
+SAVE_VERSION = 1
+HEADER = '<4sHHI'
+PLAYER = '<ffB'
+
+class SaveState(NamedTuple):
+    """Immutable copy of everything a save holds, safe to hand to another thread"""
+    map_name: str
+    player_start_pos: str
+    position: tuple[float, float]
+    facing_direction: str
+    columns: tuple[bytes, ...]
+    roster_size: int
+    party: tuple[int, ...]
+    defeated: tuple[str, ...]
+    moved: tuple[str, ...]
+
+def snapshot_roster(roster) -> tuple[tuple[bytes, ...], int]:
+    return tuple(getattr(roster, column)[:roster.size].tobytes() for column in ROSTER_COLUMNS), roster.size
+
+def write_strings(strings) -> bytes:
+    return pack('<H', len(strings)) + b''.join(write_string(text) for text in strings)
+
+def read_strings(data, offset) -> tuple[list[str], int]:
+    count, = unpack_from('<H', data, offset)
+    offset += calcsize('<H')
+    strings = []
+    for _ in range(count):
+        text, offset = read_string(data, offset)
+        strings.append(text)
+    return strings, offset
+
+def encode(state) -> bytes:
+    data = pack(HEADER, SAVE_MAGIC, SAVE_VERSION, len(state.party), state.roster_size)
+    # monster names are stored so the save survives reordering MONSTER_DATA
+    data += write_strings(MONSTER_NAMES)
+    data += write_string(state.map_name) + write_string(state.player_start_pos)
+    data += pack(PLAYER, *state.position, DIRECTIONS.index(state.facing_direction))
+    data += b''.join(state.columns)
+    data += pack(f'<{len(state.party)}I', *state.party)
+    return data + write_strings(state.defeated) + write_strings(state.moved)
+
+def write_save(state, path) -> None:
+    """Encodes and writes atomically, a crash mid write leaves the previous save intact"""
+    os.makedirs(dirname(path), exist_ok = True)
+    with open(path + '.tmp', 'wb') as file:
+        file.write(encode(state))
+    os.replace(path + '.tmp', path)
+
+def read_save(path, maps) -> tuple[SaveState, Roster]:
+    """Parses a save into its state and a rebuilt roster, raises ValueError for anything unreadable or stale against maps"""
+    with open(path, 'rb') as file:
+        data = file.read()
+    try:
+        magic, version, party_size, roster_size = unpack_from(HEADER, data)
+        if magic != SAVE_MAGIC or version != SAVE_VERSION:
+            raise ValueError(f'unsupported save file {path}')
+        offset = calcsize(HEADER)
+        names, offset = read_strings(data, offset)
+        map_name, offset = read_string(data, offset)
+        player_start_pos, offset = read_string(data, offset)
+        x, y, facing = unpack_from(PLAYER, data, offset)
+        offset += calcsize(PLAYER)
+
+        roster = Roster(max(roster_size, 1))
+        roster.size = roster_size
+        for column in ROSTER_COLUMNS:
+            array = getattr(roster, column)
+            array[:roster_size] = np.frombuffer(data, array.dtype, roster_size, offset)
+            offset += roster_size * array.itemsize
+        # map the saved name ids onto the current ones
+        remap = np.array([MONSTER_IDS[name] for name in names], dtype = roster.name_id.dtype)
+        roster.name_id[:roster_size] = remap[roster.name_id[:roster_size]]
+        party = unpack_from(f'<{party_size}I', data, offset)
+        offset += calcsize(f'<{party_size}I')
+        defeated, offset = read_strings(data, offset)
+        moved, offset = read_strings(data, offset)
+        state = SaveState(map_name, player_start_pos, (x, y), DIRECTIONS[facing], (), roster_size, party, tuple(defeated), tuple(moved))
+    except (KeyError, IndexError, struct_error, UnicodeDecodeError) as error:
+        raise ValueError(f'corrupt save file {path}: {error!r}')
+    # a readable save can still point at maps, spawns or monsters that no longer exist
+    if state.map_name not in maps:
+        raise ValueError(f'save file {path} is on unknown map {state.map_name!r}')
+    if state.player_start_pos not in maps.start_positions(state.map_name):
+        raise ValueError(f'save file {path} starts at unknown position {state.player_start_pos!r} on {state.map_name}')
+    if not state.party or len(set(state.party)) != len(state.party) or max(state.party) >= roster_size:
+        raise ValueError(f'save file {path} has an invalid party {state.party} for {roster_size} monsters')
+    return state, roster
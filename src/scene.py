@@ -0,0 +1,33 @@
+from collections import OrderedDict
+from settings import *
+from groups import AllSprites, CollisionSprites
+
+class Scene:
+    """Fully built map: sprite groups, collision structures and the player"""
+    def __init__(self, name) -> None:
+        self.name = name
+        self.all_sprites = AllSprites()
+        self.collision_sprites = CollisionSprites()
+        self.character_sprites = pygame.sprite.Group()
+        self.transition_sprites = pygame.sprite.Group()
+        self.player = None
+
+class SceneCache:
+    """LRU cache of built scenes, bounded by scene count"""
+    def __init__(self, size = SCENE_CACHE_SIZE) -> None:
+        # a scene only owns its sprite objects and grids, its images belong to the TMX maps,
+        # the shared frame dicts and the chunk cache, so a byte budget would measure memory held elsewhere
+        self.size = size
+        self.scenes: OrderedDict[str, Scene] = OrderedDict()
+
+    def get(self, name) -> Scene | None:
+        if name in self.scenes:
+            self.scenes.move_to_end(name)
+            return self.scenes[name]
+
+    def put(self, scene) -> None:
+        self.scenes[scene.name] = scene
+        self.scenes.move_to_end(scene.name)
+        # the newest scene always stays
+        while len(self.scenes) > max(self.size, 1):
+            self.scenes.popitem(last = False)
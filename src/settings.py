@@ -4,7 +4,31 @@ from sys import exit
 
 WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
 TILE_SIZE = 64 
+CHUNK_SIZE = 4
+CHUNK_CACHE_BUDGET = 64 * 1024 * 1024 # bytes of baked terrain chunks kept around the camera
+GRID_CELL_SIZE = TILE_SIZE * 4
+LOS_CELL_SIZE = TILE_SIZE // 8
 ANIMATION_SPEED = 6
+SCENE_CACHE_SIZE = 4 # built maps kept for instant return transitions, their images belong to the loaded TMX maps and chunk cache
+TELEMETRY_FRAMES = 240
+TEXT_CACHE_SIZE = 512
+ACTIVATION_MARGIN = TILE_SIZE * 2 # characters this close to the screen or their vision radius are updated
+FIXED_TIMESTEP = 1 / 120 # seconds per simulation step, 0 for one variable step per frame
+FRAME_CAP = 60 # frames per second, 0 for no limit
+VSYNC = False # wait for the display instead of FRAME_CAP
+DIRTY_RECTS = False # only redraw and push the screen areas that changed
+TELEMETRY_LOG = None # path of a .csv or .jsonl file to stream frame timings to
+HITCH_CAPTURE = False # profile continuously and save the windows around long frames
+HITCH_BUDGET = 0.02
+HITCH_WINDOW = 60
+HITCH_INTERVAL = 0.001
+HITCH_PATH = ('..', 'profiles')
+SAVE_PATH = ('..', 'saves', 'save.bin')
+AUTOSAVE_INTERVAL = 30000 # ms between autosaves
+AUDIO_CHANNELS = 8
+MUSIC_VOLUME = 0.4
+SOUND_VOLUME = 0.6
+MUSIC_FADE = 500 # ms
 BATTLE_OUTLINE_WIDTH = 4
 
 COLORS = {
@@ -0,0 +1,130 @@
+from bisect import bisect_left, insort
+from heapq import merge
+from math import ceil, inf
+from operator import itemgetter
+from settings import *
+
+class SpatialGrid:
+    """Uniform grid that buckets objects by the cells their rect overlaps"""
+    def __init__(self, cell_size = GRID_CELL_SIZE) -> None:
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], set] = {}
+        self.keys: dict[object, tuple] = {}
+
+    def cell_keys(self, rect) -> tuple:
+        size = self.cell_size
+        left, top = int(rect.left // size), int(rect.top // size)
+        # right and bottom edges are exclusive, also for fractional FRect edges
+        right = max(left, ceil(rect.right / size) - 1)
+        bottom = max(top, ceil(rect.bottom / size) - 1)
+        return tuple((x, y) for x in range(left, right + 1) for y in range(top, bottom + 1))
+
+    def insert(self, obj, rect) -> None:
+        keys = self.cell_keys(rect)
+        self.keys[obj] = keys
+        for key in keys:
+            self.cells.setdefault(key, set()).add(obj)
+
+    def remove(self, obj) -> None:
+        for key in self.keys.pop(obj, ()):
+            cell = self.cells[key]
+            cell.discard(obj)
+            if not cell:
+                del self.cells[key]
+
+    def move(self, obj, rect) -> None:
+        if self.keys.get(obj) != self.cell_keys(rect):
+            self.remove(obj)
+            self.insert(obj, rect)
+
+    def query(self, rect) -> set:
+        found = set()
+        for key in self.cell_keys(rect):
+            if key in self.cells:
+                found.update(self.cells[key])
+        return found
+
+    def clear(self) -> None:
+        self.cells.clear()
+        self.keys.clear()
+
+class DepthGrid(SpatialGrid):
+    """Spatial grid whose cells stay sorted by a depth key, so queries come back in draw order"""
+    def __init__(self, cell_size = GRID_CELL_SIZE) -> None:
+        super().__init__(cell_size)
+        self.cells: dict[tuple[int, int], list] = {}
+        self.depths: dict[object, tuple] = {}
+
+    def insert(self, obj, rect, depth) -> None:
+        # depth keys must be unique so entries never fall back to comparing objects
+        keys = self.cell_keys(rect)
+        self.keys[obj] = keys
+        self.depths[obj] = depth
+        for key in keys:
+            insort(self.cells.setdefault(key, []), (depth, obj))
+
+    def remove(self, obj) -> None:
+        depth = self.depths.pop(obj, None)
+        for key in self.keys.pop(obj, ()):
+            cell = self.cells[key]
+            del cell[bisect_left(cell, (depth,))]
+            if not cell:
+                del self.cells[key]
+
+    def move(self, obj, rect, depth) -> None:
+        if self.depths.get(obj) != depth or self.keys.get(obj) != self.cell_keys(rect):
+            self.remove(obj)
+            self.insert(obj, rect, depth)
+
+    def query(self, rect):
+        """Yields each object overlapping rect once, in ascending depth"""
+        last = None
+        for _, obj in merge(*[self.cells[key] for key in self.cell_keys(rect) if key in self.cells], key = itemgetter(0)):
+            if obj is not last:
+                yield obj
+                last = obj
+
+    def clear(self) -> None:
+        super().clear()
+        self.depths.clear()
+
+class OccupancyGrid:
+    """Bitmap of blocked cells for line of sight raycasts"""
+    def __init__(self, width, height, cell_size = LOS_CELL_SIZE) -> None:
+        self.cell_size = cell_size
+        self.cols, self.rows = ceil(width / cell_size), ceil(height / cell_size)
+        self.cells = bytearray(self.cols * self.rows)
+
+    def mark(self, rect) -> None:
+        size = self.cell_size
+        left, top = max(0, int(rect.left // size)), max(0, int(rect.top // size))
+        right = min(self.cols - 1, ceil(rect.right / size) - 1)
+        bottom = min(self.rows - 1, ceil(rect.bottom / size) - 1)
+        for row in range(top, bottom + 1):
+            self.cells[row * self.cols + left: row * self.cols + right + 1] = b'\x01' * max(0, right - left + 1)
+
+    def blocked(self, col, row) -> bool:
+        return 0 <= col < self.cols and 0 <= row < self.rows and bool(self.cells[row * self.cols + col])
+
+    def raycast(self, start, end) -> bool:
+        """Walks the cells between start and end (DDA), returns True if any of them is blocked"""
+        size = self.cell_size
+        col, row = int(start[0] // size), int(start[1] // size)
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        step_col, step_row = (1 if dx > 0 else -1), (1 if dy > 0 else -1)
+        # ray parameter t runs from 0 at start to 1 at end
+        delta_x = abs(size / dx) if dx else inf
+        delta_y = abs(size / dy) if dy else inf
+        t_x = ((col + (dx > 0)) * size - start[0]) / dx if dx else inf
+        t_y = ((row + (dy > 0)) * size - start[1]) / dy if dy else inf
+        while True:
+            if self.blocked(col, row):
+                return True
+            if min(t_x, t_y) > 1:
+                return False
+            if t_x < t_y:
+                t_x += delta_x
+                col += step_col
+            else:
+                t_y += delta_y
+                row += step_row
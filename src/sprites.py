@@ -1,4 +1,5 @@
 from settings import *
+from support import chunk_cache
 
 class Sprite(pygame.sprite.Sprite):
     """Generic Sprite"""
@@ -17,6 +18,30 @@ class MonsterPatchSprite(Sprite):
         super().__init__(pos, surf, groups, WORLD_LAYERS['main' if biome != 'sand' else 'bg'])
         self.y_sort -= 40
 
+class ChunkSprite(Sprite):
+    """Chunk of terrain tiles, baked into a surface on first draw and kept in the shared chunk cache"""
+    def __init__(self, pos, size, layout, groups, z = WORLD_LAYERS['bg']) -> None:
+        pygame.sprite.Sprite.__init__(self, groups)
+        self.layout, self.size = layout, size
+        self.rect = pygame.FRect(pos, (size, size))
+        self.z = z
+        self.y_sort = self.rect.centery
+        self.hitbox = self.rect.copy()
+
+    @property
+    def image(self) -> pygame.Surface:
+        return chunk_cache.surface(self.layout, self.size)
+
+class AnimatedChunkSprite(ChunkSprite):
+    """Chunk of tiles that animate in lockstep, only the frame on screen is baked"""
+    def __init__(self, pos, size, layouts, groups, z = WORLD_LAYERS['bg']) -> None:
+        self.frame_index, self.layouts = 0, layouts
+        super().__init__(pos, size, layouts[0], groups, z)
+
+    def update(self, dt) -> None:
+        self.frame_index += ANIMATION_SPEED * dt
+        self.layout = self.layouts[int(self.frame_index % len(self.layouts))]
+
 class AnimatedSprite(Sprite):
     """Animated sprite"""
     def __init__(self, pos, frames, groups, z = WORLD_LAYERS['main']) -> None:
@@ -1,33 +1,83 @@
 from typing import Literal
+from collections import OrderedDict
+from math import ceil
 from pygame import Surface
 from settings import *
-from os.path import join
+from io import BytesIO
+from os.path import join, exists, isdir
 from os import walk
+from concurrent.futures import Future, ThreadPoolExecutor
 from pytmx.util_pygame import load_pygame
 from pytmx import TiledMap
+from atlas import Atlas, ATLAS_MANIFEST
+
+# atlas, used by the importers once load_atlas found a built one
+atlas: Atlas | None = None
+
+def load_atlas(*path) -> None:
+    global atlas
+    if exists(join(*path, ATLAS_MANIFEST)):
+        atlas = Atlas(*path)
+
+# images and font files read ahead of time by preload
+loaded_images: dict[str, Surface] = {}
+loaded_files: dict[str, bytes] = {}
+
+def read_file(full_path) -> bytes:
+    with open(full_path, 'rb') as file:
+        return file.read()
+
+def preload(*paths) -> None:
+    """Decodes the images and reads the fonts under the given paths on a thread pool,
+    the images are converted in one batch on the main thread"""
+    file_paths = []
+    for path in paths:
+        if exists(join(*path)) and not isdir(join(*path)):
+            file_paths.append(join(*path))
+        for folder_path, sub_folders, file_names in walk(join(*path)):
+            file_paths.extend(join(folder_path, file_name) for file_name in file_names)
+    image_paths = [path for path in file_paths if path.endswith('.png') and not (atlas and path in atlas)]
+    font_paths = [path for path in file_paths if path.endswith(('.ttf', '.otf'))]
+    with ThreadPoolExecutor() as executor:
+        images = executor.map(pygame.image.load, image_paths)
+        files = executor.map(read_file, font_paths)
+        for path, surf in zip(image_paths, images):
+            loaded_images[path] = surf.convert_alpha()
+        loaded_files.update(zip(font_paths, files))
+
+def load_image(full_path) -> Surface:
+    if atlas and full_path in atlas:
+        return atlas.image(full_path)
+    if full_path in loaded_images:
+        return loaded_images[full_path]
+    return pygame.image.load(full_path).convert_alpha()
+
+def import_font(*path, size) -> pygame.Font:
+    full_path = join(*path)
+    return pygame.font.Font(BytesIO(loaded_files[full_path]) if full_path in loaded_files else full_path, size)
+
+def folder_image_names(*path) -> list[str]:
+    names = atlas.image_names(join(*path)) if atlas else None
+    if names is None:
+        names = next(walk(join(*path)), (None, None, []))[2]
+    return names
 
 # imports 
 def import_image(*path, alpha = True, format = 'png') -> Surface:
     full_path = join(*path) + f'.{format}'
-    surf = pygame.image.load(full_path).convert_alpha() if alpha else pygame.image.load(full_path).convert()
+    surf = load_image(full_path) if alpha else pygame.image.load(full_path).convert()
     return surf
 
 def import_folder(*path) -> list:
     frames = []
-    for folder_path, sub_folders, image_names in walk(join(*path)):
-        for image_name in sorted(image_names, key = lambda name: int(name.split('.')[0])):
-            full_path = join(folder_path, image_name)
-            surf = pygame.image.load(full_path).convert_alpha()
-            frames.append(surf)
+    for image_name in sorted(folder_image_names(*path), key = lambda name: int(name.split('.')[0])):
+        frames.append(load_image(join(*path, image_name)))
     return frames
 
 def import_folder_dict(*path) -> dict:
     frames = {}
-    for folder_path, sub_folders, image_names in walk(join(*path)):
-        for image_name in image_names:
-            full_path = join(folder_path, image_name)
-            surf = pygame.image.load(full_path).convert_alpha()
-            frames[image_name.split('.')[0]] = surf
+    for image_name in folder_image_names(*path):
+        frames[image_name.split('.')[0]] = load_image(join(*path, image_name))
     return frames
 
 def import_sub_folders(*path) -> dict:
@@ -41,15 +91,12 @@ def import_sub_folders(*path) -> dict:
 def import_tilemap(cols, rows, *path) -> dict:
     frames = {}
     surf = import_image(*path)
-    cell_width, cell_height = surf.get_width() / cols, surf.get_height() / rows
+    cell_width, cell_height = surf.get_width() // cols, surf.get_height() // rows
+    # cells are views into the sheet, they share its pixels and keep its per pixel alpha
     for col in range(cols):
         for row in range(rows):
             cutout_rect = pygame.Rect(col * cell_width, row * cell_height,cell_width,cell_height)
-            cutout_surf = pygame.Surface((cell_width, cell_height))
-            cutout_surf.fill('green')
-            cutout_surf.set_colorkey('green')
-            cutout_surf.blit(surf, (0,0), cutout_rect)
-            frames[(col, row)] = cutout_surf
+            frames[(col, row)] = surf.subsurface(cutout_rect)
     return frames
 
 def character_importer(cols, rows, *path) -> dict:
@@ -62,10 +109,9 @@ def character_importer(cols, rows, *path) -> dict:
 
 def all_character_import(*path) -> dict:
     new_dict = {}
-    for _,__, image_names in walk(join(*path)):
-        for image in image_names:
-            image_name = image.split('.')[0]
-            new_dict[image_name] = character_importer(4, 4, *path, image_name)
+    for image in folder_image_names(*path):
+        image_name = image.split('.')[0]
+        new_dict[image_name] = character_importer(4, 4, *path, image_name)
     return new_dict
 
 def coast_importer(cols, rows, *path) -> dict:
@@ -82,23 +128,116 @@ def coast_importer(cols, rows, *path) -> dict:
             new_dict[terrain][key] = [frame_dict[(pos[0] + index * 3 ,pos[1] + row)] for row in range(0, rows, 3)]
     return new_dict
 
-def tmx_importer(*path) -> dict[TiledMap]:
-    tmx_dict = {}
-    for folder_path, sub_folders, file_names in walk(join(*path)):
-        for file in file_names:
-            tmx_dict[file.split('.')[0]] = load_pygame(join(folder_path, file))
-    return tmx_dict
+class TmxMaps:
+    """Lazily loaded .tmx maps, with the neighbours of the current map prefetched in the background"""
+    def __init__(self, *path) -> None:
+        self.paths = {file.split('.')[0]: join(folder_path, file) \
+                      for folder_path, sub_folders, file_names in walk(join(*path)) for file in file_names}
+        self.maps: dict[str, TiledMap] = {}
+        self.futures: dict[str, Future] = {}
+        self.executor = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = 'tmx')
+
+    def __getitem__(self, name) -> TiledMap:
+        if name not in self.maps:
+            future = self.futures.pop(name, None)
+            self.maps[name] = future.result() if future else load_pygame(self.paths[name])
+        return self.maps[name]
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __contains__(self, name) -> bool:
+        return name in self.paths
+
+    def prefetch(self, name) -> None:
+        if name in self.paths and name not in self.maps and name not in self.futures:
+            self.futures[name] = self.executor.submit(load_pygame, self.paths[name])
+
+    def close(self) -> None:
+        self.executor.shutdown(wait = False, cancel_futures = True)
+
+    def start_positions(self, name) -> set[str]:
+        return {obj.properties['pos'] for obj in self[name].get_layer_by_name('Entities') if obj.name == 'Player'}
+
+    def prefetch_neighbours(self, name) -> None:
+        """Starts loading every map the transitions of the given map lead to"""
+        for obj in self[name].get_layer_by_name('Transition'):
+            self.prefetch(obj.properties['target'])
 
 def monster_importer(cols, rows, *path)-> dict[dict[Surface]]:
     monster_dict = {}
-    for folder_path, sub_folders, image_names in walk(join(*path)):
-        for image in image_names:
-            image_name = image.split('.')[0]
-            monster_dict[image_name] = {}
-            frame_dict = import_tilemap(cols, rows, *path, image_name)
-            for row, key in enumerate(('idle', 'attack')):
-                monster_dict[image_name][key] = [frame_dict[(col, row)] for col in range(cols)]
+    for image in folder_image_names(*path):
+        image_name = image.split('.')[0]
+        monster_dict[image_name] = {}
+        frame_dict = import_tilemap(cols, rows, *path, image_name)
+        for row, key in enumerate(('idle', 'attack')):
+            monster_dict[image_name][key] = [frame_dict[(col, row)] for col in range(cols)]
     return monster_dict
+
+def chunk_layouts(tiles, chunk_size = CHUNK_SIZE * TILE_SIZE, shared = None) -> dict[tuple[int, int], tuple]:
+    """Groups (pos, surf) tiles into chunk_size squares, returns the ((offset, surf), ...) layout of each chunk keyed by chunk coordinate"""
+    layouts = {}
+    for pos, surf in tiles:
+        tile_rect = surf.get_frect(topleft = pos)
+        for cx in range(int(tile_rect.left // chunk_size), ceil(tile_rect.right / chunk_size)):
+            for cy in range(int(tile_rect.top // chunk_size), ceil(tile_rect.bottom / chunk_size)):
+                offset = (tile_rect.left - cx * chunk_size, tile_rect.top - cy * chunk_size)
+                layouts.setdefault((cx, cy), []).append((offset, surf))
+    # chunks with the same tiles in the same places (open water, plain grass) share one layout, and so one baked surface
+    shared = {} if shared is None else shared
+    chunks = {}
+    for key, layout in layouts.items():
+        signature = tuple((offset, id(surf)) for offset, surf in layout)
+        chunks[key] = shared.setdefault(signature, tuple(layout))
+    return chunks
+
+def bake_chunk(layout, chunk_size) -> Surface:
+    chunk = pygame.Surface((chunk_size, chunk_size), pygame.SRCALPHA)
+    chunk.fblits([(surf, offset) for offset, surf in layout])
+    # fully covered chunks don't need per pixel alpha
+    if pygame.mask.from_surface(chunk, 254).count() == chunk_size * chunk_size:
+        chunk = chunk.convert()
+    return chunk
+
+class ChunkCache:
+    """LRU of baked chunk surfaces under a byte budget, evicted chunks are baked again from their layout when next drawn"""
+    def __init__(self, budget = CHUNK_CACHE_BUDGET) -> None:
+        self.budget = budget
+        self.size = 0
+        # keyed by layout identity, the entry keeps its layout alive so the id stays unique
+        self.surfaces: OrderedDict[int, tuple[tuple, Surface]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def surface(self, layout, chunk_size) -> Surface:
+        key = id(layout)
+        if key in self.surfaces:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return self.surfaces[key][1]
+        self.misses += 1
+        surf = bake_chunk(layout, chunk_size)
+        self.surfaces[key] = (layout, surf)
+        self.size += surf.get_width() * surf.get_height() * surf.get_bytesize()
+        while self.size > self.budget and len(self.surfaces) > 1:
+            _, (_, old) = self.surfaces.popitem(last = False)
+            self.size -= old.get_width() * old.get_height() * old.get_bytesize()
+        return surf
+
+chunk_cache = ChunkCache()
+
+def animated_chunk_layouts(tiles, chunk_size = CHUNK_SIZE * TILE_SIZE) -> dict[tuple[int, int], list[tuple]]:
+    """Groups (pos, frames) tiles that animate in lockstep into one list of frame layouts per chunk"""
+    frame_count = max((len(frames) for _, frames in tiles), default = 0)
+    # one dedupe table for every frame, identical frames of a chunk or of different chunks share a layout
+    shared = {}
+    chunks = {}
+    for index in range(frame_count):
+        frame_tiles = [(pos, frames[index % len(frames)]) for pos, frames in tiles]
+        for key, layout in chunk_layouts(frame_tiles, chunk_size, shared).items():
+            chunks.setdefault(key, []).append(layout)
+    return chunks
+
 # Game Functions
 def check_connections(radius, entity, target, tolerance = 30) -> None | Literal[True]:
     relation = vector(target.rect.center) - vector(entity.rect.center)
@@ -0,0 +1,129 @@
+import json
+import os
+from os.path import join
+from threading import Thread
+from time import perf_counter, strftime
+from pyinstrument import Profiler
+from pyinstrument.renderers import HTMLRenderer
+from settings import *
+from text_cache import text_cache
+
+class FrameTimer:
+    """Times the phases of each frame into a ring buffer, shown on an overlay and optionally streamed to a file"""
+    def __init__(self, phases, size = TELEMETRY_FRAMES, path = TELEMETRY_LOG) -> None:
+        self.phases = phases
+        self.slots = {phase: index for index, phase in enumerate(phases)}
+        self.size = size
+        # ring buffer of per phase seconds, one row per frame
+        self.buffer = [[0.0] * len(phases) for _ in range(size)]
+        self.frame = 0
+        self.current = self.buffer[0]
+        self.last = perf_counter()
+        self.visible = False
+        self.file = None
+        if path:
+            self.file = open(path, 'w', buffering = 1)
+            self.csv = path.endswith('.csv')
+            if self.csv:
+                self.file.write(','.join(['frame', *phases]) + '\n')
+
+    def begin(self) -> None:
+        self.current = self.buffer[self.frame % self.size]
+        for index in range(len(self.phases)):
+            self.current[index] = 0.0
+        self.last = perf_counter()
+
+    def mark(self, phase) -> None:
+        """Books the time since the previous mark to phase"""
+        now = perf_counter()
+        self.current[self.slots[phase]] += now - self.last
+        self.last = now
+
+    def frame_time(self) -> float:
+        """Seconds booked so far in the current frame"""
+        return sum(self.current)
+
+    def end(self) -> None:
+        if self.file:
+            times = [f'{time * 1000:.3f}' for time in self.current]
+            if self.csv:
+                self.file.write(','.join([str(self.frame), *times]) + '\n')
+            else:
+                self.file.write(json.dumps({'frame': self.frame, **{phase: float(time) for phase, time in zip(self.phases, times)}}) + '\n')
+        self.frame += 1
+
+    def toggle(self) -> None:
+        self.visible = not self.visible
+
+    def summary(self) -> dict[str, tuple[float, float]]:
+        """Average and worst milliseconds per phase over the buffered frames"""
+        rows = self.buffer[:min(self.frame, self.size)]
+        if not rows:
+            return {phase: (0.0, 0.0) for phase in self.phases}
+        return {phase: (sum(row[index] for row in rows) / len(rows) * 1000, max(row[index] for row in rows) * 1000) \
+                for phase, index in self.slots.items()}
+
+    def draw(self, surface, font) -> pygame.FRect | None:
+        if not self.visible:
+            return
+        lines = [f'{phase}: {average:.2f} / {worst:.2f} ms' for phase, (average, worst) in self.summary().items()]
+        lines.append(f'text cache: {text_cache.hits} hits / {text_cache.misses} misses')
+        surfs = [font.render(line, False, COLORS['white']) for line in lines]
+        width = max(surf.get_width() for surf in surfs) + 20
+        bg_rect = pygame.FRect(0, 0, width, sum(surf.get_height() for surf in surfs) + 20).move_to(topright = (WINDOW_WIDTH - 10, 10))
+        pygame.draw.rect(surface, COLORS['dark'], bg_rect, 0, 4)
+        top = bg_rect.top + 10
+        for surf in surfs:
+            surface.blit(surf, (bg_rect.left + 10, top))
+            top += surf.get_height()
+        return bg_rect
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+
+class HitchProfiler:
+    """Samples the game in short windows and keeps only the windows around a frame that went over budget"""
+    def __init__(self, budget = HITCH_BUDGET, window = HITCH_WINDOW, path = HITCH_PATH) -> None:
+        self.budget = budget
+        self.window = window
+        self.path = path
+        self.hitch = None
+        self.frames_left = 0
+        self.start_window()
+
+    def start_window(self) -> None:
+        self.profiler = Profiler(interval = HITCH_INTERVAL, async_mode = 'disabled')
+        self.profiler.start()
+        self.frames = 0
+
+    def end_frame(self, frame_time, map_name, pos) -> None:
+        self.frames += 1
+        if frame_time > self.budget and not self.hitch:
+            # keep sampling for half a window so the frames after the hitch are in the profile too
+            self.hitch = (frame_time, map_name, pos)
+            self.frames_left = self.window // 2
+        if self.hitch:
+            self.frames_left -= 1
+            if self.frames_left <= 0:
+                self.save()
+        elif self.frames >= self.window:
+            self.profiler.stop()
+            self.start_window()
+
+    def save(self) -> None:
+        session = self.profiler.stop()
+        frame_time, map_name, pos = self.hitch
+        file_name = f'hitch_{strftime("%Y%m%d-%H%M%S")}_{map_name}_{int(pos[0])}_{int(pos[1])}_{frame_time * 1000:.0f}ms.html'
+        # rendering the report takes a while, so it happens off the game loop
+        Thread(target = self.write, args = (session, file_name), daemon = True).start()
+        self.hitch = None
+        self.start_window()
+
+    def write(self, session, file_name) -> None:
+        os.makedirs(join(*self.path), exist_ok = True)
+        with open(join(*self.path, file_name), 'w') as file:
+            file.write(HTMLRenderer().render(session))
+
+    def close(self) -> None:
+        self.profiler.stop()
@@ -0,0 +1,33 @@
+from collections import OrderedDict
+from pygame import Surface
+from settings import *
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by font, text, color and scale"""
+    def __init__(self, size = TEXT_CACHE_SIZE) -> None:
+        self.size = size
+        self.surfaces: OrderedDict[tuple, Surface] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias = False, scale = 1) -> Surface:
+        # pygame.Color isn't hashable, plain tuples and names are
+        key = (font, text, color if isinstance(color, str) else tuple(color), antialias, scale)
+        if key in self.surfaces:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return self.surfaces[key]
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        if scale != 1:
+            surf = pygame.transform.scale_by(surf, scale)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.size:
+            self.surfaces.popitem(last = False)
+        return surf
+
+    def clear(self) -> None:
+        self.surfaces.clear()
+        self.hits = self.misses = 0
+
+text_cache = TextCache()
@@ -1,5 +1,35 @@
+from heapq import heappush, heappop
+from itertools import count
+from weakref import ref
 from pygame.time import get_ticks
 
+class Scheduler:
+	"""Min-heap of timer deadlines, each frame only the timers that are due get touched"""
+	def __init__(self):
+		self.heap = []
+		self.counter = count()
+
+	def schedule(self, timer):
+		# timers are held weakly so discarded scenes don't stay alive through their repeating timers
+		heappush(self.heap, (timer.start_time + timer.duration, next(self.counter), ref(timer), timer.activation))
+
+	def update(self):
+		current_time = get_ticks()
+		due = []
+		while self.heap and self.heap[0][0] <= current_time:
+			due.append(heappop(self.heap))
+		# firing can reschedule a timer that is due again right away (zero durations), that entry waits for the next update
+		for _, _, timer_ref, activation in due:
+			timer = timer_ref()
+			# entries of deactivated or restarted timers are left in the heap and skipped here
+			if timer and timer.active and timer.activation == activation:
+				timer.fire()
+
+	def clear(self):
+		self.heap.clear()
+
+scheduler = Scheduler()
+
 class Timer:
 	def __init__(self, duration, repeat = False, autostart = False, func = None):
 		self.duration = duration
@@ -7,22 +37,23 @@ class Timer:
 		self.active = False
 		self.repeat = repeat
 		self.func = func
+		self.activation = 0
 		if autostart:
 			self.activate()
 
 	def activate(self):
 		self.active = True
 		self.start_time = get_ticks()
+		self.activation += 1
+		scheduler.schedule(self)
 
 	def deactivate(self):
 		self.active = False
 		self.start_time = 0
+		self.activation += 1
 		if self.repeat:
 			self.activate()
 
-	def update(self):
-		if self.active:
-			current_time = get_ticks()
-			if current_time - self.start_time >= self.duration:
-				if self.func: self.func()
-				self.deactivate()
\ No newline at end of file
+	def fire(self):
+		if self.func: self.func()
+		self.deactivate()